@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
@@ -19,6 +19,9 @@ from routes.screener import screener_bp
 from routes.portfolio import portfolio_bp
 from routes.risk import risk_bp
 from routes.watchlist import watchlist_bp
+from services.market_ticker import market_ticker
+from services.quote_refresher import quote_refresher
+from services.universe_manager import universe_manager
 app = Flask(__name__)
 
 from flask_cors import CORS
@@ -28,7 +31,8 @@ CORS(
     resources={r"/api/*": {"origins": "*"}},
     supports_credentials=False,
     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "If-None-Match"],
+    expose_headers=["X-Universe-Version", "X-Market-Epoch", "X-Total-Count", "X-Next-Cursor", "X-Screener-Plan", "ETag"],
 )
 
 
@@ -40,12 +44,29 @@ app.register_blueprint(screener_bp, url_prefix='/api/screener')
 app.register_blueprint(risk_bp, url_prefix='/api/risk')
 app.register_blueprint(watchlist_bp, url_prefix='/api/watchlist')
 
+# Hot-reload the stock universe when its source changes (UNIVERSE_WATCH_INTERVAL=0 disables)
+universe_manager.start_watching()
+
+# Keep in-demand symbols on live Alpha Vantage quotes (requests never call the API)
+if os.getenv('ALPHA_VANTAGE_API_KEY'):
+    quote_refresher.start()
+
+@app.after_request
+def add_snapshot_headers(response):
+    # Describe the snapshot the handler read (e.g. a cursor's epoch), not whatever is current now
+    version, epoch = g.get('market_snapshot') or (universe_manager.version, market_ticker.epoch)
+    response.headers['X-Universe-Version'] = version
+    response.headers['X-Market-Epoch'] = str(epoch)
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
         "status": "ok", 
         "message": "Backend is running!",
-        "alpha_vantage_enabled": bool(os.getenv('ALPHA_VANTAGE_API_KEY'))
+        "alpha_vantage_enabled": bool(os.getenv('ALPHA_VANTAGE_API_KEY')),
+        "universe_version": universe_manager.version,
+        "market_epoch": market_ticker.epoch
     })
 
 @app.errorhandler(404)
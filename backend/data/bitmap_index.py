@@ -0,0 +1,150 @@
+"""
+Bitmap indexes over bucketed fundamentals
+Each indexed column is split into equi-depth value buckets with a packed
+bitmap (np.packbits) per bucket, plus cumulative bitmaps so any run of whole
+buckets is one AND-NOT. Range queries OR the fully covered buckets and refine
+only the boundary buckets row by row. Sectors get one bitmap per sector code.
+Built once per universe snapshot.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Columns indexed by default (market_cap doubles as the market-cap tier index)
+BITMAP_COLUMNS = ('pe_ratio', 'roce', 'dividend_yield', 'market_cap', 'profit_growth')
+
+DEFAULT_BUCKETS = 32
+
+# Range results memoized per snapshot; fundamentals don't change within one
+RESULT_CACHE_SIZE = 1024
+
+
+def pack(mask):
+    return np.packbits(mask)
+
+
+class BucketBitmap:
+    """Equi-depth bucket bitmaps for one numeric column"""
+
+    def __init__(self, values, buckets=DEFAULT_BUCKETS):
+        values = np.asarray(values, dtype=np.float64)
+        self.values = values
+        self.size = len(values)
+
+        missing = np.isnan(values)
+        present = np.flatnonzero(~missing)
+        order = present[np.argsort(values[present], kind='stable')]
+
+        # Equi-depth split of the sorted rows; equal values never straddle a boundary
+        splits = np.linspace(0, len(order), min(buckets, max(len(order), 1)) + 1).astype(int)
+        sorted_values = values[order]
+        bounds = [0]
+        for split in splits[1:-1]:
+            split = np.searchsorted(sorted_values, sorted_values[split], side='left') if split < len(order) else split
+            if split > bounds[-1]:
+                bounds.append(split)
+        bounds.append(len(order))
+
+        self.bucket_rows = []
+        self.bucket_min = []
+        self.bucket_max = []
+        bitmaps = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end <= start:
+                continue
+            rows = np.sort(order[start:end])
+            self.bucket_rows.append(rows)
+            self.bucket_min.append(sorted_values[start])
+            self.bucket_max.append(sorted_values[end - 1])
+            mask = np.zeros(self.size, dtype=bool)
+            mask[rows] = True
+            bitmaps.append(pack(mask))
+
+        self.bucket_min = np.array(self.bucket_min)
+        self.bucket_max = np.array(self.bucket_max)
+        self.bitmaps = bitmaps
+        self.cumulative = list(np.bitwise_or.accumulate(np.array(bitmaps), axis=0)) if bitmaps else []
+        self.missing = pack(missing)
+        self.empty = pack(np.zeros(self.size, dtype=bool))
+        self.everything = pack(np.ones(self.size, dtype=bool))
+
+    def range(self, lo=None, hi=None):
+        """Packed bitmap of rows with lo <= value <= hi (NaN only matches an unbounded range)"""
+        if lo is None and hi is None:
+            return self.everything.copy()
+        if not self.bitmaps:
+            return self.empty.copy()
+
+        lo = -np.inf if lo is None else lo
+        hi = np.inf if hi is None else hi
+        if lo > hi:
+            return self.empty.copy()
+
+        # Buckets overlapping [lo, hi] form one contiguous run
+        first = int(np.searchsorted(self.bucket_max, lo, side='left'))
+        last = int(np.searchsorted(self.bucket_min, hi, side='right')) - 1
+        if first > last:
+            return self.empty.copy()
+
+        # Whole buckets inside the range, minus boundary buckets that need refining
+        full_first = first if self.bucket_min[first] >= lo else first + 1
+        full_last = last if self.bucket_max[last] <= hi else last - 1
+
+        if full_first <= full_last:
+            result = self.cumulative[full_last].copy()
+            if full_first > 0:
+                result &= ~self.cumulative[full_first - 1]
+        else:
+            result = self.empty.copy()
+
+        boundary = {first, last} - set(range(full_first, full_last + 1))
+        if boundary:
+            mask = np.zeros(self.size, dtype=bool)
+            for bucket in boundary:
+                rows = self.bucket_rows[bucket]
+                values = self.values[rows]
+                mask[rows[(values >= lo) & (values <= hi)]] = True
+            result |= pack(mask)
+        return result
+
+
+class BitmapIndex:
+    """Bitmap indexes for one universe snapshot"""
+
+    def __init__(self, universe, columns=BITMAP_COLUMNS, buckets=DEFAULT_BUCKETS):
+        self.size = len(universe)
+        self.columns = {column: BucketBitmap(universe.columns[column], buckets) for column in columns}
+        codes = np.asarray(universe.sector_codes)
+        self.sectors = [pack(codes == code) for code in range(len(universe.sectors))]
+        self.zeros = {column: pack(universe.columns[column] == 0) for column in columns}
+
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def range(self, column, lo=None, hi=None, missing_passes=False):
+        """Packed bitmap for lo <= column <= hi; with missing_passes, NaN/zero rows also match"""
+        key = (column, lo, hi, missing_passes)
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                return cached
+
+        index = self.columns[column]
+        result = index.range(lo, hi)
+        if missing_passes:
+            result |= index.missing | self.zeros[column]
+        result.setflags(write=False)
+
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return result
+
+    def sector(self, code):
+        return self.sectors[code]
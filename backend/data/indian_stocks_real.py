@@ -4,6 +4,8 @@ Data includes: CMP, P/E, Market Cap, Dividend Yield, Quarterly Profits, Sales, R
 Source: Updated as of December 2025
 """
 
+from data.symbol_registry import SymbolRegistry
+
 INDIAN_STOCKS_DATA = [
     {
         "symbol": "RELIANCE",
@@ -959,15 +961,18 @@ INDIAN_STOCKS_DATA = [
     }
 ]
 
+# Symbol index over INDIAN_STOCKS_DATA (symbol ID == position in the list)
+SYMBOL_REGISTRY = SymbolRegistry.from_records(INDIAN_STOCKS_DATA)
+
 # Helper function to get stock by symbol
 def get_stock_by_symbol(symbol):
-    """Get stock data by symbol"""
-    for stock in INDIAN_STOCKS_DATA:
-        if stock["symbol"] == symbol:
-            return stock
-    return None
+    """Get stock data by symbol or alias (case-insensitive)"""
+    symbol_id = SYMBOL_REGISTRY.get_id(symbol)
+    if symbol_id is None:
+        return None
+    return INDIAN_STOCKS_DATA[symbol_id]
 
 # Helper function to get all symbols
 def get_all_symbols():
     """Get list of all stock symbols"""
-    return [stock["symbol"] for stock in INDIAN_STOCKS_DATA]
+    return SYMBOL_REGISTRY.symbols
@@ -0,0 +1,106 @@
+"""
+Type-ahead search index over symbols and company names
+Built once per universe snapshot. Prefix matches come from a sorted key list
+(a flattened trie: every key sharing a prefix sits in one contiguous bisect
+range); substring matches come from a trigram index. Results are ranked
+exact symbol > symbol prefix > name/word prefix > substring.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+
+# Key kinds in the prefix table (also their rank tiers)
+SYMBOL_KEY = 1
+NAME_KEY = 2
+
+# Separator between symbol and name in the substring text; never typed in a query
+_SEPARATOR = '\x00'
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, symbols, names):
+        self._exact = {}
+        entries = []
+        texts = []
+
+        for row, (symbol, name) in enumerate(zip(symbols, names)):
+            symbol = symbol.lower()
+            name = name.lower()
+            self._exact.setdefault(symbol, row)
+            entries.append((symbol, SYMBOL_KEY, row))
+            entries.append((name, NAME_KEY, row))
+            for word in name.split()[1:]:
+                entries.append((word, NAME_KEY, row))
+            texts.append(symbol + _SEPARATOR + name)
+
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._key_kinds = [kind for _, kind, _ in entries]
+        self._key_rows = [row for _, _, row in entries]
+
+        postings = defaultdict(list)
+        for row, text in enumerate(texts):
+            for gram in _trigrams(text):
+                postings[gram].append(row)
+        self._trigrams = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+        self._texts = texts
+        self._scan_texts = np.array(texts, dtype=str)
+
+    def _prefix_rows(self, query):
+        """Rows whose symbol / name / name word starts with query, as (symbol rows, name rows)"""
+        lo = bisect_left(self._keys, query)
+        hi = bisect_left(self._keys, query + '\uffff', lo)
+        symbol_rows, name_rows = set(), set()
+        for i in range(lo, hi):
+            (symbol_rows if self._key_kinds[i] == SYMBOL_KEY else name_rows).add(self._key_rows[i])
+        return sorted(symbol_rows), sorted(name_rows)
+
+    def _substring_rows(self, query):
+        """Rows whose symbol or name contains query"""
+        if len(query) < 3:
+            # Too short for trigrams: one vectorized scan
+            return np.flatnonzero(np.char.find(self._scan_texts, query) >= 0).tolist()
+
+        candidates = None
+        for gram in sorted(_trigrams(query), key=lambda g: len(self._trigrams.get(g, ()))):
+            postings = self._trigrams.get(gram)
+            if postings is None:
+                return []
+            candidates = postings if candidates is None else np.intersect1d(candidates, postings, assume_unique=True)
+            if len(candidates) == 0:
+                return []
+        return [row for row in candidates.tolist() if query in self._texts[row]]
+
+    def search(self, query, limit=10):
+        """Ranked row IDs matching query, stopping once `limit` rows are found"""
+        query = (query or '').strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        results = []
+        seen = set()
+
+        def take(rows):
+            for row in rows:
+                if row not in seen:
+                    seen.add(row)
+                    results.append(row)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        exact = self._exact.get(query)
+        if exact is not None and take([exact]):
+            return results
+
+        symbol_rows, name_rows = self._prefix_rows(query)
+        if take(symbol_rows) or take(name_rows):
+            return results
+
+        take(self._substring_rows(query))
+        return results
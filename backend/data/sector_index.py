@@ -0,0 +1,43 @@
+"""
+Sector index for a universe snapshot
+Sector -> row-id array, canonical names with case-insensitive resolution and
+per-sector counts, so sector pages and the sector list are O(k) lookups.
+"""
+import numpy as np
+
+
+class SectorIndex:
+    def __init__(self, sectors, sector_codes):
+        self.names = tuple(sectors)
+        self._lookup = {name.lower(): code for code, name in enumerate(self.names)}
+
+        codes = np.asarray(sector_codes)
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=len(self.names)) if len(codes) else np.zeros(len(self.names), dtype=int)
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+
+        self._rows = []
+        for code in range(len(self.names)):
+            rows = order[bounds[code]:bounds[code + 1]]
+            rows.setflags(write=False)
+            self._rows.append(rows)
+        self.counts = tuple(int(count) for count in counts)
+
+    def resolve(self, sector):
+        """Case-insensitive sector name -> code, or None if unknown"""
+        if sector is None:
+            return None
+        return self._lookup.get(str(sector).strip().lower())
+
+    def canonical(self, sector):
+        """Canonical spelling of a sector name, or None if unknown"""
+        code = self.resolve(sector)
+        return None if code is None else self.names[code]
+
+    def rows(self, code):
+        """Row IDs (in universe order) for a sector code"""
+        return self._rows[code]
+
+    def catalog(self):
+        """Sorted sector names with their stock counts"""
+        return [{'name': name, 'count': count} for name, count in zip(self.names, self.counts)]
@@ -0,0 +1,108 @@
+"""
+Symbol registry for the stock universe
+Maps symbols and their aliases (exchange suffixes, NSE/BSE codes, ISINs)
+to stable integer symbol IDs with O(1) case-insensitive lookups
+"""
+
+# Exchange suffixes accepted as aliases of the bare symbol (RELIANCE.NS, RELIANCE.BSE, ...)
+EXCHANGE_SUFFIXES = ('.NS', '.NSE', '.BO', '.BSE')
+
+# Record keys that carry alternative identifiers for a listing
+ALIAS_KEYS = ('nse_code', 'bse_code', 'isin')
+
+
+def _normalize(key):
+    return str(key).strip().upper()
+
+
+class SymbolRegistry:
+    def __init__(self):
+        self._symbols = []
+        self._index = {}
+        self._aliases = {}
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build a registry from stock records, in record order. IDs are row
+        positions, so a repeated symbol raises ValueError instead of shifting
+        every later row
+        """
+        registry = cls()
+        for row, record in enumerate(records):
+            symbol_id = registry.add(record['symbol'])
+            if symbol_id != row:
+                raise ValueError(
+                    f"Duplicate symbol {record['symbol']!r} at rows {symbol_id} and {row}"
+                )
+            for key in ALIAS_KEYS:
+                if record.get(key):
+                    registry.add_alias(record[key], symbol_id)
+        return registry
+
+    def add(self, symbol):
+        """Register a symbol and return its integer ID"""
+        key = _normalize(symbol)
+        symbol_id = self._index.get(key)
+        if symbol_id is not None:
+            if _normalize(self._symbols[symbol_id]) != key:
+                raise ValueError(f"Symbol {symbol!r} is already an alias of {self._symbols[symbol_id]!r}")
+            return symbol_id
+
+        symbol_id = len(self._symbols)
+        self._symbols.append(str(symbol).strip())
+        self._index[key] = symbol_id
+        for suffix in EXCHANGE_SUFFIXES:
+            self._index.setdefault(key + suffix, symbol_id)
+        return symbol_id
+
+    def add_alias(self, alias, symbol):
+        """
+        Point an alias at an existing symbol (or symbol ID); an alias that
+        already resolves to another listing raises ValueError
+        """
+        symbol_id = symbol if isinstance(symbol, int) else self.get_id(symbol)
+        if symbol_id is None or not 0 <= symbol_id < len(self._symbols):
+            raise KeyError(f"Unknown symbol: {symbol}")
+        key = _normalize(alias)
+        existing = self._index.get(key)
+        if existing is not None and existing != symbol_id:
+            raise ValueError(
+                f"Alias {alias!r} for {self._symbols[symbol_id]!r} already resolves to {self._symbols[existing]!r}"
+            )
+        self._index[key] = symbol_id
+        self._aliases[str(alias).strip()] = symbol_id
+
+    def get_id(self, key):
+        """Resolve a symbol or alias to its ID, or None if unknown"""
+        if key is None:
+            return None
+        return self._index.get(_normalize(key))
+
+    def get_ids(self, keys):
+        """Resolve many symbols at once; unknown keys map to None"""
+        index = self._index
+        return [index.get(_normalize(key)) if key is not None else None for key in keys]
+
+    def resolve(self, key):
+        """Resolve a symbol or alias to its canonical symbol"""
+        symbol_id = self.get_id(key)
+        return self._symbols[symbol_id] if symbol_id is not None else None
+
+    def symbol(self, symbol_id):
+        """Get the canonical symbol for an ID"""
+        return self._symbols[symbol_id]
+
+    @property
+    def symbols(self):
+        return list(self._symbols)
+
+    def aliases(self):
+        """Explicitly registered aliases as {alias: canonical symbol}"""
+        return {alias: self._symbols[symbol_id] for alias, symbol_id in self._aliases.items()}
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __contains__(self, key):
+        return self.get_id(key) is not None
@@ -0,0 +1,132 @@
+"""
+Columnar snapshot of the stock universe
+One contiguous NumPy array per fundamental field plus categorical sector codes,
+so screens and rankings run as vectorized masks/argsorts instead of dict loops
+"""
+import hashlib
+from functools import cached_property
+
+import numpy as np
+
+from data.bitmap_index import BitmapIndex
+from data.search_index import SearchIndex
+from data.sector_index import SectorIndex
+from data.symbol_registry import SymbolRegistry
+
+# Numeric fundamentals stored as float64 columns (missing values are NaN)
+NUMERIC_FIELDS = (
+    'price',
+    'pe_ratio',
+    'market_cap',
+    'dividend_yield',
+    'roce',
+    'quarterly_profit',
+    'profit_growth',
+    'quarterly_sales',
+    'sales_growth',
+)
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+class StockUniverse:
+    def __init__(self, symbols, names, sector_codes, sectors, columns, registry=None, version=None):
+        self.symbols = list(symbols)
+        self.names = list(names)
+        self.sectors = tuple(sectors)
+        self.sector_codes = _frozen(np.ascontiguousarray(sector_codes, dtype=np.int16))
+        self.columns = {
+            field: _frozen(np.ascontiguousarray(columns[field], dtype=np.float64))
+            for field in NUMERIC_FIELDS
+        }
+        self.registry = registry or SymbolRegistry.from_records({'symbol': s} for s in self.symbols)
+        # Registry IDs are used as row indices
+        if len(self.registry) != len(self.symbols):
+            raise ValueError(
+                f"Symbol registry has {len(self.registry)} entries for {len(self.symbols)} rows"
+            )
+
+        if version:
+            self.version = version
+
+    @cached_property
+    def version(self):
+        """Content hash identifying this snapshot (same data -> same version)"""
+        digest = hashlib.sha1()
+        digest.update('\x1f'.join(self.symbols).encode())
+        digest.update('\x1f'.join(self.names).encode())
+        digest.update('\x1f'.join(self.sectors).encode())
+        digest.update(self.sector_codes.tobytes())
+        for field in NUMERIC_FIELDS:
+            digest.update(self.columns[field].tobytes())
+        return digest.hexdigest()[:12]
+
+    def build_indexes(self):
+        """Eagerly build the lazy lookup structures (used before publishing a snapshot)"""
+        self.version
+        self.sector_index
+        self.search_index
+        self.bitmap_index
+        return self
+
+    @cached_property
+    def sector_index(self):
+        """Sector -> rows index with case-insensitive name resolution"""
+        return SectorIndex(self.sectors, self.sector_codes)
+
+    @cached_property
+    def search_index(self):
+        """Prefix/trigram index over symbols and names (built on first search)"""
+        return SearchIndex(self.symbols, self.names)
+
+    @cached_property
+    def bitmap_index(self):
+        """Bucketed bitmaps over screener fundamentals and sectors"""
+        return BitmapIndex(self)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build the columnar snapshot from a list of stock dicts"""
+        records = list(records)
+        sectors = sorted({record['sector'] for record in records})
+        codes = {sector: code for code, sector in enumerate(sectors)}
+
+        columns = {
+            field: np.array(
+                [np.nan if record.get(field) is None else record[field] for record in records],
+                dtype=np.float64,
+            )
+            for field in NUMERIC_FIELDS
+        }
+
+        return cls(
+            symbols=[record['symbol'] for record in records],
+            names=[record['name'] for record in records],
+            sector_codes=[codes[record['sector']] for record in records],
+            sectors=sectors,
+            columns=columns,
+            registry=SymbolRegistry.from_records(records),
+        )
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def row_of(self, symbol):
+        """Row ID for a symbol or alias, or None if unknown"""
+        return self.registry.get_id(symbol)
+
+    def sector_code(self, sector):
+        """Case-insensitive sector name -> code, or None if unknown"""
+        return self.sector_index.resolve(sector)
+
+    def record(self, row):
+        """Rebuild the original dict for a single row"""
+        record = {'symbol': self.symbols[row], 'name': self.names[row]}
+        for field in NUMERIC_FIELDS:
+            value = float(self.columns[field][row])
+            record[field] = None if np.isnan(value) else value
+        record['sector'] = self.sectors[self.sector_codes[row]]
+        return record
@@ -0,0 +1,176 @@
+"""
+On-disk columnar bundle for the stock universe
+A directory of .npy files (one per column) plus meta.json, loaded with mmap so
+workers share the same pages. Falls back to the seed data in indian_stocks_real.
+
+Export the seed universe to a bundle:
+    python -m data.universe_store [path]
+"""
+import hashlib
+import importlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from data.symbol_registry import SymbolRegistry
+from data.universe import NUMERIC_FIELDS, StockUniverse
+
+DEFAULT_UNIVERSE_PATH = os.getenv(
+    'UNIVERSE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universe'),
+)
+
+META_FILE = 'meta.json'
+
+# Column name -> expected dtype kind ('U' unicode, 'i' int, 'f' float)
+COLUMN_KINDS = {'symbol': 'U', 'name': 'U', 'sector_code': 'i', **{field: 'f' for field in NUMERIC_FIELDS}}
+
+
+def _column_path(path, name):
+    return os.path.join(path, f'{name}.npy')
+
+
+def _digest(values):
+    return hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest()[:16]
+
+
+def bundle_exists(path=None):
+    """Check whether a universe bundle has been written at path"""
+    return os.path.isfile(os.path.join(path or DEFAULT_UNIVERSE_PATH, META_FILE))
+
+
+def write_bundle(universe, path=None):
+    """Write a universe to disk as a columnar bundle"""
+    path = path or DEFAULT_UNIVERSE_PATH
+    os.makedirs(path, exist_ok=True)
+
+    columns = {
+        'symbol': np.array(universe.symbols, dtype=str),
+        'name': np.array(universe.names, dtype=str),
+        'sector_code': np.asarray(universe.sector_codes, dtype=np.int16),
+        **universe.columns,
+    }
+    columns = {name: np.ascontiguousarray(values) for name, values in columns.items()}
+
+    # Write each column under a temp name and rename into place, so readers
+    # never mmap a half-written file; meta.json goes last
+    for name, values in columns.items():
+        target = _column_path(path, name)
+        tmp = target + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp, target)
+
+    meta = {
+        'count': len(universe),
+        'fields': list(NUMERIC_FIELDS),
+        'sectors': list(universe.sectors),
+        'aliases': universe.registry.aliases(),
+        # Lets readers detect columns from a different write than this meta
+        'digests': {name: _digest(values) for name, values in columns.items()},
+        'version': universe.version,
+        'created_at': datetime.now().isoformat(),
+    }
+    target = os.path.join(path, META_FILE)
+    with open(target + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(target + '.tmp', target)
+
+    return path
+
+
+def load_bundle(path=None):
+    """Load a universe bundle with memory-mapped numeric columns"""
+    path = path or DEFAULT_UNIVERSE_PATH
+
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+
+    columns = {name: np.load(_column_path(path, name), mmap_mode='r') for name in COLUMN_KINDS}
+    _validate(meta, columns)
+
+    symbols = columns['symbol'].tolist()
+    names = columns['name'].tolist()
+
+    registry = SymbolRegistry.from_records({'symbol': symbol} for symbol in symbols)
+    for alias, symbol in meta.get('aliases', {}).items():
+        registry.add_alias(alias, symbol)
+
+    return StockUniverse(
+        symbols=symbols,
+        names=names,
+        sector_codes=columns['sector_code'],
+        sectors=meta['sectors'],
+        columns={field: columns[field] for field in NUMERIC_FIELDS},
+        registry=registry,
+        version=meta.get('version'),
+    )
+
+
+def _validate(meta, columns):
+    """Raise ValueError unless every column matches meta (count, dtype, digest)"""
+    count = meta['count']
+    digests = meta.get('digests', {})
+    for name, values in columns.items():
+        if values.ndim != 1 or len(values) != count:
+            raise ValueError(f"Bundle column {name} has shape {values.shape}, expected ({count},)")
+        if values.dtype.kind != COLUMN_KINDS[name]:
+            raise ValueError(f"Bundle column {name} has dtype {values.dtype}")
+        if name in digests and _digest(values) != digests[name]:
+            raise ValueError(f"Bundle column {name} does not match {META_FILE} (bundle still being written?)")
+
+    codes = columns['sector_code']
+    if count and (codes.min() < 0 or codes.max() >= len(meta['sectors'])):
+        raise ValueError("Bundle sector codes out of range")
+
+
+def load_seed_universe(reload=False):
+    """Build the universe from the bundled Python seed data"""
+    from data import indian_stocks_real
+    if reload:
+        indian_stocks_real = importlib.reload(indian_stocks_real)
+    return StockUniverse.from_records(indian_stocks_real.INDIAN_STOCKS_DATA)
+
+
+def seed_path():
+    """Source file of the seed data (watched for changes when no bundle exists)"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indian_stocks_real.py')
+
+
+def source_stamp(path=None):
+    """Identity of the current universe source; changes whenever it is rewritten"""
+    path = path or DEFAULT_UNIVERSE_PATH
+    source = os.path.join(path, META_FILE) if bundle_exists(path) else seed_path()
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return (source, None, None)
+    return (source, stat.st_mtime_ns, stat.st_size)
+
+
+def load_universe(path=None, reload=False, fallback=True):
+    """
+    Load the universe bundle if present, otherwise the seed data. A broken
+    bundle falls back to the seed only with fallback=True (cold start);
+    otherwise the error is raised so the caller can keep what it has
+    """
+    path = path or DEFAULT_UNIVERSE_PATH
+    if bundle_exists(path):
+        try:
+            return load_bundle(path)
+        except Exception as e:
+            if not fallback:
+                raise
+            print(f"Error loading universe bundle from {path}: {str(e)}")
+
+    return load_seed_universe(reload=reload)
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_UNIVERSE_PATH
+    universe = load_seed_universe()
+    write_bundle(universe, target)
+    print(f"Wrote {len(universe)} stocks to {target}")
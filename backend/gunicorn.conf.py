@@ -0,0 +1,14 @@
+"""
+Gunicorn settings (picked up automatically when gunicorn starts in backend/)
+/api/stocks/stream holds its request open for as long as a tab is watching,
+so workers need threads: with the default sync worker every open stream would
+occupy a whole worker process and starve the rest of the API.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('FLASK_PORT', 5000)}"
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+# Streams send a keep-alive every 15s; the timeout only applies to stuck workers
+timeout = 60
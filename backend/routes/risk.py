@@ -2,11 +2,41 @@ from flask import Blueprint, jsonify
 import os
 import json
 from groq import Groq
+from services.single_flight import SingleFlight
 
 risk_bp = Blueprint('risk', __name__)
 
 groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
 
+# Concurrent assessments of the same stock share one Groq call
+risk_flights = SingleFlight()
+
+
+def _assess(prompt):
+    """Ask Groq for a risk assessment and parse its JSON reply"""
+    response = groq_client.chat.completions.create(
+        model="llama-3.1-70b-versatile",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.3,
+        max_tokens=300
+    )
+    
+    result = response.choices[0].message.content.strip()
+
+    # --- Clean markdown safely ---
+    if result.startswith("```"):
+        # Remove ```json ... ``` wrapper
+        parts = result.split("```")
+        if len(parts) >= 2:
+            cleaned = parts[1].strip()
+            if cleaned.startswith("json"):
+                cleaned = cleaned[4:].strip()
+            result = cleaned
+    
+    # Parse JSON
+    return json.loads(result)
+
+
 @risk_bp.route('/assess/<symbol>', methods=['GET'])
 def assess_risk(symbol):
     """AI-powered risk assessment for a stock"""
@@ -38,27 +68,7 @@ Return only valid JSON, no markdown or extra text.
 """
 
     try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.1-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=300
-        )
-        
-        result = response.choices[0].message.content.strip()
-
-        # --- Clean markdown safely ---
-        if result.startswith("```"):
-            # Remove ```json ... ``` wrapper
-            parts = result.split("```")
-            if len(parts) >= 2:
-                cleaned = parts[1].strip()
-                if cleaned.startswith("json"):
-                    cleaned = cleaned[4:].strip()
-                result = cleaned
-        
-        # Parse JSON
-        risk_data = json.loads(result)
+        risk_data = risk_flights.do(stock['symbol'], _assess, prompt)
         
         return jsonify({
             "symbol": symbol,
@@ -1,46 +1,79 @@
 from flask import Blueprint, jsonify, request
 from services.indian_stock_generator import indian_stock_gen
-from data.indian_stocks_real import INDIAN_STOCKS_DATA
+from services.list_query import CursorExpired, ListQuery
+from services.response_cache import cached_response
+from services.response_formats import UnsupportedFormat, arrow_response, encode_response, response_format
+from services.streaming import ndjson_response, page_headers, wants_ndjson
 
 screener_bp = Blueprint('screener', __name__)
 
 @screener_bp.route('/stocks', methods=['GET'])
+@cached_response()
 def get_stocks():
-    """Get all stocks for screener"""
+    """Get all stocks for screener (supports sort, limit, cursor and fields)"""
     try:
-        limit = request.args.get('limit', type=int)
-        stocks = indian_stock_gen.get_all_stocks(limit=limit)
-        return jsonify({
+        query = ListQuery.from_args(request.args)
+        fmt = response_format(request)
+        if fmt == 'arrow':
+            columns, page = indian_stock_gen.list_columns(query)
+            return arrow_response(columns, page, page_headers(page))
+        
+        stocks, page = indian_stock_gen.list_stocks(query)
+        return encode_response(fmt, {
             "success": True,
             "stocks": stocks,
-            "total": len(stocks)
-        }), 200
+            **page
+        })
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 406
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @screener_bp.route('/filter', methods=['POST'])
 def filter_stocks():
-    """Filter stocks based on criteria"""
+    """Filter stocks based on criteria (supports sort, limit, cursor and fields)"""
     try:
         filters = request.get_json()
         
         if not filters:
             return jsonify({"error": "No filters provided"}), 400
         
-        results = indian_stock_gen.filter_stocks(filters)
+        query = ListQuery.from_args(request.args)
         
-        return jsonify({
+        if wants_ndjson(request):
+            chunks, page = indian_stock_gen.iter_stocks(query, filters=filters)
+            return ndjson_response(chunks, page_headers(page))
+        
+        fmt = response_format(request)
+        if fmt == 'arrow':
+            columns, page = indian_stock_gen.list_columns(query, filters=filters)
+            return arrow_response(columns, page, page_headers(page))
+        
+        results, page = indian_stock_gen.list_stocks(query, filters=filters)
+        
+        return encode_response(fmt, {
             "success": True,
             "stocks": results,
-            "total": len(results),
-            "filters": filters
-        }), 200
+            "filters": filters,
+            **page
+        })
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 406
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @screener_bp.route('/search', methods=['GET'])
+@cached_response()
 def search_stocks():
     """Search stocks by name or symbol"""
     try:
@@ -49,7 +82,8 @@ def search_stocks():
         if not query:
             return jsonify({"error": "Search query required"}), 400
         
-        results = indian_stock_gen.search_stocks(query)
+        limit = request.args.get('limit', default=10, type=int)
+        results = indian_stock_gen.search_stocks(query, limit=limit)
         
         return jsonify({
             "success": True,
@@ -61,39 +95,56 @@ def search_stocks():
 
 
 @screener_bp.route('/sectors', methods=['GET'])
+@cached_response(per='universe')
 def get_sectors():
     """Get list of all sectors"""
     try:
-        sectors = list(set([stock['sector'] for stock in INDIAN_STOCKS_DATA]))
+        catalog, _ = indian_stock_gen.get_sector_catalog()
         return jsonify({
             "success": True,
-            "sectors": sorted(sectors)
+            "sectors": [sector['name'] for sector in catalog],
+            "counts": {sector['name']: sector['count'] for sector in catalog}
         }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @screener_bp.route('/sector/<sector>', methods=['GET'])
+@cached_response()
 def get_sector_stocks(sector):
-    """Get all stocks in a specific sector"""
+    """Get all stocks in a specific sector (supports sort, limit, cursor and fields)"""
     try:
-        stocks = indian_stock_gen.get_sector_stocks(sector)
-        return jsonify({
+        query = ListQuery.from_args(request.args)
+        fmt = response_format(request)
+        if fmt == 'arrow':
+            columns, page = indian_stock_gen.list_columns(query, sector=sector)
+            return arrow_response(columns, {"sector": sector, **page}, page_headers(page))
+        
+        stocks, page = indian_stock_gen.list_stocks(query, sector=sector)
+        return encode_response(fmt, {
             "success": True,
             "sector": sector,
             "stocks": stocks,
-            "total": len(stocks)
-        }), 200
+            **page
+        })
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 406
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @screener_bp.route('/top-gainers', methods=['GET'])
+@cached_response()
 def top_gainers():
     """Get top gaining stocks"""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        gainers = indian_stock_gen.get_top_gainers(limit=limit)
+        sector = request.args.get('sector')
+        gainers = indian_stock_gen.get_top_gainers(limit=limit, sector=sector)
         return jsonify({
             "success": True,
             "gainers": gainers
@@ -103,11 +154,13 @@ def top_gainers():
 
 
 @screener_bp.route('/top-losers', methods=['GET'])
+@cached_response()
 def top_losers():
     """Get top losing stocks"""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        losers = indian_stock_gen.get_top_losers(limit=limit)
+        sector = request.args.get('sector')
+        losers = indian_stock_gen.get_top_losers(limit=limit, sector=sector)
         return jsonify({
             "success": True,
             "losers": losers
@@ -117,11 +170,13 @@ def top_losers():
 
 
 @screener_bp.route('/most-active', methods=['GET'])
+@cached_response()
 def most_active():
     """Get most active stocks by volume"""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        active = indian_stock_gen.get_most_active(limit=limit)
+        sector = request.args.get('sector')
+        active = indian_stock_gen.get_most_active(limit=limit, sector=sector)
         return jsonify({
             "success": True,
             "active": active
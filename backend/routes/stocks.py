@@ -1,11 +1,32 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from services.indian_stock_generator import indian_stock_gen
 from services.ai_search import ai_search
+from services.list_query import CursorExpired, ListQuery
+from services.ohlcv_generator import iter_records, to_records
+from services.price_stream import StreamsFull, price_broadcaster
+from services.quote_refresher import quote_refresher
+from services.response_cache import cached_response
+from services.response_formats import UnsupportedFormat, arrow_response, encode_response, response_format
+from services.streaming import ndjson_response, page_headers, wants_ndjson
+from functools import wraps
+import json
 import random
 
+# Seconds between SSE keep-alive comments on a quiet stream
+STREAM_HEARTBEAT = 15
+
 stocks_bp = Blueprint('stocks', __name__)
 
 
+def counts_demand(view):
+    """Count the route's <symbol> as quote demand; sits outside @cached_response so hits and 304s count too"""
+    @wraps(view)
+    def wrapper(symbol, *args, **kwargs):
+        quote_refresher.record_request([symbol])
+        return view(symbol, *args, **kwargs)
+    return wrapper
+
+
 @stocks_bp.route('/data', methods=['POST'])
 def get_stock_data():
     """Get real-time stock data for given symbols"""
@@ -16,14 +37,77 @@ def get_stock_data():
         if not symbols:
             return jsonify({"error": "No symbols provided"}), 400
         
-        stocks = []
-        for symbol in symbols:
-            stock_data = indian_stock_gen.get_stock_data(symbol)
-            if stock_data:
-                stocks.append(stock_data)
+        if not isinstance(symbols, list):
+            return jsonify({"error": "symbols must be a list"}), 400
+        
+        quote_refresher.record_request(symbols)
+        stocks, unknown = indian_stock_gen.get_stocks_batch(symbols)
+        return jsonify({"stocks": stocks, "unknown": unknown}), 200
+        
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@stocks_bp.route('/stream', methods=['GET'])
+def stream_prices():
+    """
+    Server-Sent Events price stream for ?symbols=A,B,C
+    A 'snapshot' event with full quotes, then 'delta' events carrying only
+    the fields that changed per symbol (event id = market epoch)
+    """
+    try:
+        symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+        
+        if not symbols:
+            return jsonify({"error": "No symbols provided"}), 400
+        
+        quote_refresher.record_request(symbols)
+        stocks, unknown = indian_stock_gen.get_stocks_batch(symbols)
+        subscription = price_broadcaster.subscribe(symbols)
+        
+        def events():
+            try:
+                yield f"event: snapshot\ndata: {json.dumps({'stocks': stocks, 'unknown': unknown})}\n\n"
+                while True:
+                    item = subscription.next(timeout=STREAM_HEARTBEAT)
+                    if item is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    epoch, delta = item
+                    yield f"id: {epoch}\nevent: delta\ndata: {json.dumps(delta, separators=(',', ':'))}\n\n"
+            finally:
+                price_broadcaster.unsubscribe(subscription)
         
-        return jsonify({"stocks": stocks}), 200
+        return Response(events(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
         
+    except StreamsFull as e:
+        return jsonify({"error": str(e)}), 503
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@stocks_bp.route('/changes', methods=['GET'])
+@cached_response()
+def get_changes():
+    """
+    Quotes changed since ?since=<epoch> (optionally ?symbols=A,B and ?fields=...)
+    full=true means the epoch aged out and every requested quote is returned
+    """
+    try:
+        since = request.args.get('since', default=-1, type=int)
+        symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+        
+        stocks, epoch, full = indian_stock_gen.get_changes(since, symbols=symbols, fields=fields)
+        return jsonify({"since": since, "epoch": epoch, "full": full, "stocks": stocks}), 200
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -31,13 +115,30 @@ def get_stock_data():
 
 @stocks_bp.route('/all', methods=['GET'])
 @stocks_bp.route('/', methods=['GET'])  # Added this alias
+@cached_response()
 def get_all_stocks():
-    """Get all available stocks"""
+    """Get all available stocks (supports sort, limit, cursor and fields)"""
     try:
-        limit = request.args.get('limit', type=int)
-        stocks = indian_stock_gen.get_all_stocks(limit=limit)
-        return jsonify({"stocks": stocks, "total": len(stocks)}), 200
+        query = ListQuery.from_args(request.args)
+        
+        if wants_ndjson(request):
+            chunks, page = indian_stock_gen.iter_stocks(query)
+            return ndjson_response(chunks, page_headers(page))
+        
+        fmt = response_format(request)
+        if fmt == 'arrow':
+            columns, page = indian_stock_gen.list_columns(query)
+            return arrow_response(columns, page, page_headers(page))
         
+        stocks, page = indian_stock_gen.list_stocks(query)
+        return encode_response(fmt, {"stocks": stocks, **page})
+        
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 406
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -45,6 +146,8 @@ def get_all_stocks():
 
 @stocks_bp.route('/detail/<symbol>', methods=['GET'])
 @stocks_bp.route('/<symbol>', methods=['GET'])  # Added this alias
+@counts_demand
+@cached_response()
 def get_stock_detail(symbol):
     """Get detailed information for a specific stock"""
     try:
@@ -61,22 +164,41 @@ def get_stock_detail(symbol):
 
 @stocks_bp.route('/historical/<symbol>', methods=['GET'])
 @stocks_bp.route('/<symbol>/history', methods=['GET'])  # Added this alias
+@cached_response()
 def get_historical_data(symbol):
     """Get historical data for a stock"""
     try:
         days = request.args.get('days', default=30, type=int)
-        historical = indian_stock_gen.get_historical_data(symbol.upper(), days=days)
+        fmt = response_format(request)
+        
+        if request.args.get('source') == 'alphavantage':
+            # Bars previously ingested from Alpha Vantage (no API call)
+            from services.alpha_vantage_service import alpha_vantage
+            bars = alpha_vantage.get_stored_bars(symbol.upper(), days=days)
+        else:
+            bars = indian_stock_gen.get_historical_bars(symbol.upper(), days=days)
         
-        if not historical:
+        if bars is None or len(bars['date']) == 0:
             return jsonify({"error": "Stock not found or data unavailable"}), 404
         
-        return jsonify({"symbol": symbol.upper(), "history": historical, "data": historical}), 200
+        if wants_ndjson(request):
+            return ndjson_response(iter_records(bars), {'X-Total-Count': str(len(bars['date']))})
+        
+        if fmt == 'arrow':
+            columns = {name: bars[name] for name in ('date', 'open', 'high', 'low', 'close', 'volume')}
+            return arrow_response(columns, {"symbol": symbol.upper()})
+        
+        historical = to_records(bars)
+        return encode_response(fmt, {"symbol": symbol.upper(), "history": historical, "data": historical})
         
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 406
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @stocks_bp.route('/search', methods=['GET', 'POST'])
+@cached_response()
 def search_stocks():
     """
     Search stocks by query string (GET) or AI-powered natural language (POST)
@@ -111,7 +233,8 @@ def search_stocks():
             if not query:
                 return jsonify({"error": "Query parameter required"}), 400
             
-            results = indian_stock_gen.search_stocks(query)
+            limit = request.args.get('limit', default=10, type=int)
+            results = indian_stock_gen.search_stocks(query, limit=limit)
             return jsonify({"results": results, "total": len(results)}), 200
         
     except Exception as e:
@@ -120,26 +243,45 @@ def search_stocks():
 
 @stocks_bp.route('/filter', methods=['POST'])
 def filter_stocks():
-    """Filter stocks based on criteria"""
+    """Filter stocks based on criteria (supports sort, limit, cursor and fields)"""
     try:
         filters = request.get_json()
         
         if not filters:
             return jsonify({"error": "Filters required"}), 400
         
-        results = indian_stock_gen.filter_stocks(filters)
-        return jsonify({"stocks": results, "total": len(results)}), 200
+        query = ListQuery.from_args(request.args)
         
+        if wants_ndjson(request):
+            chunks, page = indian_stock_gen.iter_stocks(query, filters=filters)
+            return ndjson_response(chunks, page_headers(page))
+        
+        fmt = response_format(request)
+        if fmt == 'arrow':
+            columns, page = indian_stock_gen.list_columns(query, filters=filters)
+            return arrow_response(columns, page, page_headers(page))
+        
+        results, page = indian_stock_gen.list_stocks(query, filters=filters)
+        return encode_response(fmt, {"stocks": results, **page})
+        
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 406
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @stocks_bp.route('/top-gainers', methods=['GET'])
+@cached_response()
 def get_top_gainers():
     """Get top gaining stocks"""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        gainers = indian_stock_gen.get_top_gainers(limit=limit)
+        sector = request.args.get('sector')
+        gainers = indian_stock_gen.get_top_gainers(limit=limit, sector=sector)
         return jsonify({"gainers": gainers}), 200
         
     except Exception as e:
@@ -147,11 +289,13 @@ def get_top_gainers():
 
 
 @stocks_bp.route('/top-losers', methods=['GET'])
+@cached_response()
 def get_top_losers():
     """Get top losing stocks"""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        losers = indian_stock_gen.get_top_losers(limit=limit)
+        sector = request.args.get('sector')
+        losers = indian_stock_gen.get_top_losers(limit=limit, sector=sector)
         return jsonify({"losers": losers}), 200
         
     except Exception as e:
@@ -159,11 +303,13 @@ def get_top_losers():
 
 
 @stocks_bp.route('/most-active', methods=['GET'])
+@cached_response()
 def get_most_active():
     """Get most active stocks"""
     try:
         limit = request.args.get('limit', default=10, type=int)
-        active = indian_stock_gen.get_most_active(limit=limit)
+        sector = request.args.get('sector')
+        active = indian_stock_gen.get_most_active(limit=limit, sector=sector)
         return jsonify({"active": active}), 200
         
     except Exception as e:
@@ -171,11 +317,24 @@ def get_most_active():
 
 
 @stocks_bp.route('/sector/<sector>', methods=['GET'])
+@cached_response()
 def get_sector_stocks(sector):
-    """Get all stocks in a sector"""
+    """Get all stocks in a sector (supports sort, limit, cursor and fields)"""
     try:
-        stocks = indian_stock_gen.get_sector_stocks(sector)
-        return jsonify({"sector": sector, "stocks": stocks, "total": len(stocks)}), 200
+        query = ListQuery.from_args(request.args)
+        fmt = response_format(request)
+        if fmt == 'arrow':
+            columns, page = indian_stock_gen.list_columns(query, sector=sector)
+            return arrow_response(columns, {"sector": sector, **page}, page_headers(page))
+        
+        stocks, page = indian_stock_gen.list_stocks(query, sector=sector)
+        return encode_response(fmt, {"sector": sector, "stocks": stocks, **page})
         
+    except UnsupportedFormat as e:
+        return jsonify({"error": str(e)}), 406
+    except CursorExpired as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
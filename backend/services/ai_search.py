@@ -2,6 +2,8 @@ import os
 import json
 from groq import Groq
 
+from services.single_flight import SingleFlight
+
 class AIStockSearch:
     def __init__(self):
         api_key = os.getenv('GROQ_API_KEY')
@@ -12,11 +14,16 @@ class AIStockSearch:
         else:
             self.enabled = False
             print("AI Search disabled - no API key")
+        # Identical queries in flight at the same time share one Groq call
+        self.flights = SingleFlight()
     
     def parse_query(self, user_query):
         if not self.enabled:
             return None
         
+        return self.flights.do(' '.join(user_query.lower().split()), self._parse_query, user_query)
+    
+    def _parse_query(self, user_query):
         try:
             # Build prompt cleanly
             prompt = (
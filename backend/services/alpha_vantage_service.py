@@ -1,43 +1,224 @@
+import asyncio
+import json
 import os
-import requests
-import time
+import threading
+from concurrent.futures import Future
 from typing import Dict, List, Optional
 from datetime import datetime
 
+import httpx
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib parser
+    orjson = None
+
+from services.ohlcv_generator import to_records
+from services.rate_limiter import DEFAULT_CACHE_PATH, RateLimited, TokenBucketLimiter
+from services.single_flight import SingleFlight
+from services.timeseries_store import DEFAULT_TIMESERIES_PATH, TimeSeriesStore
+from services.ttl_cache import PersistentTTLCache
+
+# Free-tier budgets, shared by every worker process
+REQUESTS_PER_MINUTE = int(os.getenv('ALPHA_VANTAGE_PER_MINUTE', 5))
+REQUESTS_PER_DAY = int(os.getenv('ALPHA_VANTAGE_PER_DAY', 25))
+
+REQUEST_TIMEOUT = 10
+
+# Response cache per function: (fresh for, served stale while refreshing for) in seconds
+CACHE_TTLS = {
+    'quote': (60, 24 * 3600),
+    'overview': (7 * 24 * 3600, 120 * 24 * 3600),  # fundamentals change quarterly
+    'daily_series': (12 * 3600, 7 * 24 * 3600),    # one new bar per day; bars live in the time-series store
+}
+
+# Pooled keep-alive connections shared by every call
+MAX_CONNECTIONS = 10
+
+# Bars in a 'compact' daily series
+COMPACT_BARS = 100
+
+# TIME_SERIES_DAILY field -> bar column
+SERIES_FIELDS = {
+    'open': '1. open',
+    'high': '2. high',
+    'low': '3. low',
+    'close': '4. close',
+    'volume': '5. volume',
+}
+
+
+def _loads(content):
+    """Parse a JSON response body (orjson when installed)"""
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+def _number(data, key, cast=float):
+    """Overview field -> number (Alpha Vantage sends the string 'None' when missing)"""
+    value = data.get(key, 0)
+    return cast(value) if value not in ('None', None, '', '-') else 0
+
+
+def _series_columns(series):
+    """'Time Series (Daily)' mapping -> column arrays sorted by date"""
+    dates = np.array(list(series), dtype='datetime64[D]')
+    order = np.argsort(dates, kind='stable')
+    bars = {'date': dates[order]}
+    # NumPy parses the number strings in C; no per-bar dicts or float() calls
+    for field, key in SERIES_FIELDS.items():
+        dtype = np.int64 if field == 'volume' else np.float64
+        bars[field] = np.array([bar[key] for bar in series.values()], dtype=dtype)[order]
+    return bars
+
+
 class AlphaVantageService:
-    BASE_URL = "https://www.alphavantage.co/query"
+    BASE_URL = os.getenv('ALPHA_VANTAGE_BASE_URL', "https://www.alphavantage.co/query")
     
     def __init__(self):
         self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY', 'demo')
         self.request_count = 0
-        self.last_request_time = 0
-        
-    def _rate_limit(self):
-        """Ensure we don't exceed 5 requests per minute"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < 12:  # 60 seconds / 5 requests = 12 seconds between requests
-            sleep_time = 12 - time_since_last
-            print(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        self.limiter = TokenBucketLimiter('alphavantage', [(REQUESTS_PER_MINUTE, 60), (REQUESTS_PER_DAY, 86400)])
+        # Daily bars fetched from Alpha Vantage, kept across calls and restarts
+        self.history = TimeSeriesStore(os.path.join(DEFAULT_TIMESERIES_PATH, 'alphavantage'))
+        # API responses, kept across restarts (see CACHE_TTLS)
+        self.cache = PersistentTTLCache(os.path.join(DEFAULT_CACHE_PATH, 'alphavantage.sqlite3'))
+        # Concurrent identical fetches (and background refreshes) share one API call
+        self.flights = SingleFlight()
+        # Background event loop owning the pooled async client (started on first call)
+        self._loop = None
+        self._client = None
+        self._loop_lock = threading.Lock()
+        # Background revalidations in flight (the loop only keeps weak references to tasks)
+        self._background = set()
+    
+    def _ensure_loop(self):
+        """Start the background event loop and its persistent HTTP client once"""
+        with self._loop_lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='alpha-vantage-loop', daemon=True).start()
+            
+            async def open_client():
+                return httpx.AsyncClient(
+                    timeout=REQUEST_TIMEOUT,
+                    limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                        max_keepalive_connections=MAX_CONNECTIONS),
+                )
+            
+            self._client = asyncio.run_coroutine_threadsafe(open_client(), loop).result()
+            self._loop = loop
+            return loop
+    
+    def _run(self, coro):
+        """Sync facade: run a coroutine on the background loop and wait for its result"""
+        return self.submit(coro).result()
+    
+    def submit(self, coro) -> Future:
+        """
+        Queue a coroutine on the background loop and return a concurrent Future, e.g.
+        alpha_vantage.submit(alpha_vantage.get_quote_async('IBM')) waits for a token
+        without holding up the caller
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+    
+    def close(self):
+        """Close pooled connections and stop the background loop"""
+        with self._loop_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+            self._client = None
+    
+    async def _shutdown(self):
+        """Cancel background revalidations and close pooled connections (on the loop)"""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await self._client.aclose()
+    
+    async def _fetch(self, params: Dict, wait: Optional[float] = None) -> Dict:
+        """
+        One API call over the pooled client, once the rate limiter grants a token.
+        wait: seconds to wait for a token (0 fails fast, None waits as long as needed);
+        raises RateLimited when the deadline can't be met
+        """
+        await self.limiter.acquire_async(wait)
         self.request_count += 1
+        response = await self._client.get(self.BASE_URL, params={**params, 'apikey': self.api_key})
+        return _loads(response.content)
     
-    def get_quote(self, symbol: str) -> Optional[Dict]:
-        """Get real-time quote for a symbol using GLOBAL_QUOTE"""
-        self._rate_limit()
+    async def _cached(self, function: str, key: str, fetch, wait: Optional[float]):
+        """
+        Serve from the persistent cache: fresh hits directly, stale hits immediately
+        with a background refresh, misses (or entries past their stale window) from the API
+        """
+        fresh_for, stale_for = CACHE_TTLS[function]
+        # SQLite and file I/O run on worker threads so they never stall the shared loop
+        hit = await asyncio.to_thread(self.cache.get, function, key)
+        if hit is not None:
+            value, age = hit
+            if age < fresh_for:
+                return value
+            if age < stale_for:
+                self._revalidate(function, key, fetch)
+                return value
         
-        params = {
-            'function': 'GLOBAL_QUOTE',
-            'symbol': symbol,
-            'apikey': self.api_key
-        }
+        return await self._load(function, key, fetch, wait)
+    
+    def _revalidate(self, function: str, key: str, fetch):
+        """Refresh a stale entry in the background (joins a fetch already in flight)"""
+        task = asyncio.ensure_future(self._load(function, key, fetch, None))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _load(self, function: str, key: str, fetch, wait: Optional[float]):
+        """
+        Fetch and cache one entry; concurrent loads of the same entry with the
+        same `wait` share one API call. The wait is part of the flight key so a
+        fail-fast caller never blocks behind a queued background refresh, and a
+        queued refresh never gives up with a fail-fast caller
+        """
+        async def load():
+            value = await fetch(wait)
+            if value is not None:
+                await asyncio.to_thread(self.cache.set, function, key, value)
+            return value
         
+        return await self.flights.do_async((function, key, wait), load)
+    
+    async def get_quote_async(self, symbol: str, wait: Optional[float] = None) -> Optional[Dict]:
+        """Get real-time quote for a symbol using GLOBAL_QUOTE"""
+        return await self._cached('quote', symbol, lambda wait: self._fetch_quote(symbol, wait), wait)
+    
+    async def refresh_quote_async(self, symbol: str, wait: Optional[float] = None) -> Optional[Dict]:
+        """Fetch a quote from the API regardless of the cache, and cache it"""
+        return await self._load('quote', symbol, lambda wait: self._fetch_quote(symbol, wait), wait)
+    
+    async def get_company_overview_async(self, symbol: str, wait: Optional[float] = None) -> Optional[Dict]:
+        """Get company overview including fundamentals"""
+        return await self._cached('overview', symbol, lambda wait: self._fetch_overview(symbol, wait), wait)
+    
+    async def get_time_series_daily_async(self, symbol: str, outputsize: str = 'compact',
+                                          wait: Optional[float] = None) -> Optional[List[Dict]]:
+        """Get daily time series data (last 100 days for compact)"""
+        fetched = await self._cached('daily_series', f"{symbol}:{outputsize}",
+                                     lambda wait: self._fetch_time_series(symbol, outputsize, wait), wait)
+        if fetched is None:
+            return None
+        if outputsize == 'compact':
+            bars = await asyncio.to_thread(self.history.last, symbol, COMPACT_BARS)
+        else:
+            bars = await asyncio.to_thread(self.history.range, symbol)
+        return to_records(bars) if len(bars['date']) else None
+    
+    async def _fetch_quote(self, symbol: str, wait: Optional[float]) -> Optional[Dict]:
+        """GLOBAL_QUOTE from the API"""
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
-            data = response.json()
+            data = await self._fetch({'function': 'GLOBAL_QUOTE', 'symbol': symbol}, wait)
             
             if 'Global Quote' in data and data['Global Quote']:
                 quote = data['Global Quote']
@@ -52,92 +233,114 @@ class AlphaVantageService:
             
             return None
             
+        except RateLimited as e:
+            print(f"Skipped quote for {symbol}: {str(e)}")
+            return None
         except Exception as e:
             print(f"Error fetching quote for {symbol}: {str(e)}")
             return None
     
-    def get_company_overview(self, symbol: str) -> Optional[Dict]:
-        """Get company overview including fundamentals"""
-        self._rate_limit()
-        
-        params = {
-            'function': 'OVERVIEW',
-            'symbol': symbol,
-            'apikey': self.api_key
-        }
-        
+    async def _fetch_overview(self, symbol: str, wait: Optional[float]) -> Optional[Dict]:
+        """OVERVIEW from the API"""
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
-            data = response.json()
+            data = await self._fetch({'function': 'OVERVIEW', 'symbol': symbol}, wait)
             
             if data and 'Symbol' in data:
                 return {
                     'symbol': data.get('Symbol'),
                     'name': data.get('Name'),
                     'sector': data.get('Sector'),
-                    'marketCap': int(data.get('MarketCapitalization', 0)),
-                    'pe': float(data.get('PERatio', 0)) if data.get('PERatio') != 'None' else 0,
-                    'roe': float(data.get('ReturnOnEquityTTM', 0)) if data.get('ReturnOnEquityTTM') != 'None' else 0,
-                    'debtToEquity': float(data.get('DebtEquityRatio', 0)) if data.get('DebtEquityRatio') != 'None' else 0,
-                    'dividendYield': float(data.get('DividendYield', 0)) if data.get('DividendYield') != 'None' else 0,
-                    'eps': float(data.get('EPS', 0)) if data.get('EPS') != 'None' else 0,
-                    'week52High': float(data.get('52WeekHigh', 0)) if data.get('52WeekHigh') != 'None' else 0,
-                    'week52Low': float(data.get('52WeekLow', 0)) if data.get('52WeekLow') != 'None' else 0,
+                    'marketCap': _number(data, 'MarketCapitalization', int),
+                    'pe': _number(data, 'PERatio'),
+                    'roe': _number(data, 'ReturnOnEquityTTM'),
+                    'debtToEquity': _number(data, 'DebtEquityRatio'),
+                    'dividendYield': _number(data, 'DividendYield'),
+                    'eps': _number(data, 'EPS'),
+                    'week52High': _number(data, '52WeekHigh'),
+                    'week52Low': _number(data, '52WeekLow'),
                 }
             
             return None
             
+        except RateLimited as e:
+            print(f"Skipped overview for {symbol}: {str(e)}")
+            return None
         except Exception as e:
             print(f"Error fetching overview for {symbol}: {str(e)}")
             return None
     
-    def get_time_series_daily(self, symbol: str, outputsize: str = 'compact') -> Optional[List[Dict]]:
-        """Get daily time series data (last 100 days for compact)"""
-        self._rate_limit()
-        
-        params = {
-            'function': 'TIME_SERIES_DAILY',
-            'symbol': symbol,
-            'outputsize': outputsize,  # 'compact' or 'full'
-            'apikey': self.api_key
-        }
-        
+    async def _fetch_time_series(self, symbol: str, outputsize: str, wait: Optional[float]) -> Optional[Dict]:
+        """
+        TIME_SERIES_DAILY from the API, merged into the local store (a compact
+        fetch only appends new bars). Returns a small summary for the cache;
+        the bars themselves are read back from the store
+        """
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
-            data = response.json()
+            data = await self._fetch({
+                'function': 'TIME_SERIES_DAILY',
+                'symbol': symbol,
+                'outputsize': outputsize,  # 'compact' or 'full'
+            }, wait)
             
-            if 'Time Series (Daily)' in data:
-                time_series = data['Time Series (Daily)']
-                result = []
-                
-                for date, values in sorted(time_series.items()):
-                    result.append({
-                        'date': date,
-                        'open': float(values['1. open']),
-                        'high': float(values['2. high']),
-                        'low': float(values['3. low']),
-                        'close': float(values['4. close']),
-                        'volume': int(values['5. volume'])
-                    })
-                
-                return result
+            if data.get('Time Series (Daily)'):
+                bars = _series_columns(data['Time Series (Daily)'])
+                added = await asyncio.to_thread(self.history.merge, symbol, bars)
+                return {
+                    'bars': len(bars['date']),
+                    'added': added,
+                    'last': str(bars['date'][-1]),
+                }
             
             return None
             
+        except RateLimited as e:
+            print(f"Skipped time series for {symbol}: {str(e)}")
+            return None
         except Exception as e:
             print(f"Error fetching time series for {symbol}: {str(e)}")
             return None
     
-    def get_bulk_quotes(self, symbols: List[str]) -> Dict[str, Dict]:
-        """Get quotes for multiple symbols (respecting rate limits)"""
-        results = {}
-        
-        for symbol in symbols:
-            quote = self.get_quote(symbol)
-            if quote:
-                results[symbol] = quote
-        
-        return results
+    async def get_bulk_quotes_async(self, symbols: List[str], wait: Optional[float] = None) -> Dict[str, Dict]:
+        """Get quotes for multiple symbols concurrently (the rate limiter paces dispatch)"""
+        quotes = await asyncio.gather(*(self.get_quote_async(symbol, wait) for symbol in symbols))
+        return {symbol: quote for symbol, quote in zip(symbols, quotes) if quote}
+    
+    # Sync facade: fails fast (None) when out of budget unless `wait` allows a bounded wait
+    
+    def get_quote(self, symbol: str, wait: float = 0) -> Optional[Dict]:
+        """Get real-time quote for a symbol using GLOBAL_QUOTE"""
+        return self._run(self.get_quote_async(symbol, wait))
+    
+    def refresh_quote(self, symbol: str, wait: Optional[float] = None) -> Optional[Dict]:
+        """Fetch a quote from the API regardless of the cache (waits for a token by default)"""
+        return self._run(self.refresh_quote_async(symbol, wait))
+    
+    def get_company_overview(self, symbol: str, wait: float = 0) -> Optional[Dict]:
+        """Get company overview including fundamentals"""
+        return self._run(self.get_company_overview_async(symbol, wait))
+    
+    def get_time_series_daily(self, symbol: str, outputsize: str = 'compact', wait: float = 0) -> Optional[List[Dict]]:
+        """Get daily time series data (last 100 days for compact)"""
+        return self._run(self.get_time_series_daily_async(symbol, outputsize, wait))
+    
+    def get_stored_bars(self, symbol: str, days: int = 100) -> Optional[Dict[str, np.ndarray]]:
+        """Last `days` stored daily bars for a symbol as column arrays, without calling the API"""
+        bars = self.history.last(symbol, days)
+        if len(bars['date']) == 0:
+            return None
+        return bars
+
+    def get_stored_time_series(self, symbol: str, days: int = 100) -> Optional[List[Dict]]:
+        """Last `days` stored daily bars for a symbol, without calling the API"""
+        bars = self.get_stored_bars(symbol, days)
+        return None if bars is None else to_records(bars)
+
+    def get_bulk_quotes(self, symbols: List[str], wait: float = 0) -> Dict[str, Dict]:
+        """
+        Get quotes for multiple symbols (respecting rate limits). Request handlers
+        should read the market ticker instead; QuoteRefresher keeps it updated
+        """
+        return self._run(self.get_bulk_quotes_async(symbols, wait))
 
 # Global instance
 alpha_vantage = AlphaVantageService()
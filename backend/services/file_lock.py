@@ -0,0 +1,39 @@
+"""
+Cross-process file lock
+Uses fcntl.flock where available; elsewhere (e.g. Windows dev machines) it
+degrades to a process-local lock.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def _local_lock(path):
+    with _local_locks_guard:
+        return _local_locks.setdefault(path, threading.Lock())
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on `path` (created if missing) for the block"""
+    # flock is per open file description, so threads also need a local lock
+    with _local_lock(path):
+        if fcntl is None:
+            yield
+            return
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
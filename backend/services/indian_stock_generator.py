@@ -1,169 +1,348 @@
 """
 Indian Stock Data Generator using real market data
 """
-import random
-from datetime import datetime, timedelta
-from data.indian_stocks_real import INDIAN_STOCKS_DATA, get_stock_by_symbol, get_all_symbols
+import os
+from datetime import date
+
+import numpy as np
+
+from services.market_ticker import market_ticker
+from services.screener_engine import screener_engine
+from services.ohlcv_generator import generate_ohlcv, to_records
+from services.timeseries_store import DEFAULT_TIMESERIES_PATH, TimeSeriesStore
+from services.universe_manager import universe_manager
+
+
+# Rows per chunk when quotes are produced incrementally for streaming
+STREAM_CHUNK_ROWS = 500
+
+# Fields returned for changed symbols unless the client projects its own
+CHANGE_FIELDS = ('symbol', 'price', 'change', 'changePercent', 'volume', 'week52High', 'week52Low')
+
+# Snapshot arrays compared to decide whether a quote changed between two epochs
+CHANGE_ARRAYS = ('price', 'change', 'change_percent', 'volume', 'week52_high', 'week52_low')
+
+# Bars generated up front the first time a symbol's history is requested
+DEFAULT_HISTORY_DAYS = 365
+
+
+# Quote fields in response order
+QUOTE_FIELDS = (
+    'symbol', 'name', 'price', 'change', 'changePercent', 'volume', 'marketCap',
+    'pe', 'peRatio', 'dividendYield', 'week52High', 'week52Low', 'sector', 'roce',
+    'roe', 'debtRatio', 'quarterlyProfit', 'profitGrowth', 'quarterlySales', 'salesGrowth',
+)
+
+# Quote field -> universe fundamental column
+FUNDAMENTAL_QUOTE_FIELDS = {
+    'marketCap': 'market_cap',
+    'pe': 'pe_ratio',
+    'peRatio': 'pe_ratio',
+    'dividendYield': 'dividend_yield',
+    'roce': 'roce',
+    'roe': 'roce',
+    'quarterlyProfit': 'quarterly_profit',
+    'profitGrowth': 'profit_growth',
+    'quarterlySales': 'quarterly_sales',
+    'salesGrowth': 'sales_growth',
+}
+
+
+def _days(delta):
+    """numpy timedelta64 -> whole days as int"""
+    return int(delta.astype('timedelta64[D]').astype(np.int64))
+
+
+def _nullable(values):
+    """ndarray -> list with NaN mapped to None (JSON null)"""
+    return [None if v != v else v for v in values.tolist()]
 
 
 class IndianStockGenerator:
-    def __init__(self):
-        self.stocks = INDIAN_STOCKS_DATA
-        self.symbols = get_all_symbols()
-    
+    def __init__(self, manager=universe_manager, ticker=market_ticker):
+        # Columnar engine; the dict API below is a thin view over it
+        self.manager = manager
+        self.ticker = ticker
+        self.history = TimeSeriesStore(os.path.join(DEFAULT_TIMESERIES_PATH, 'synthetic'))
+
+    @property
+    def universe(self):
+        """Current universe snapshot; each query reads it once and sticks with it"""
+        return self.manager.current()
+
+    @property
+    def symbols(self):
+        return self.universe.symbols
+
+    def snapshot(self):
+        """Current market snapshot (prices plus the universe they belong to)"""
+        return self.ticker.snapshot()
+
+    def _quote_columns(self, snap, rows, fields=None):
+        """Quote fields for the given rows as columns (missing fundamentals stay NaN)"""
+        rows = np.asarray(rows, dtype=np.intp)
+        fields = QUOTE_FIELDS if fields is None else fields
+        u = snap.universe
+        market = snap.market(rows)
+        columns = {}
+
+        for field in fields:
+            if field in FUNDAMENTAL_QUOTE_FIELDS:
+                columns[field] = u.columns[FUNDAMENTAL_QUOTE_FIELDS[field]][rows]
+            elif field == 'symbol':
+                columns[field] = [u.symbols[row] for row in rows.tolist()]
+            elif field == 'name':
+                columns[field] = [u.names[row] for row in rows.tolist()]
+            elif field == 'sector':
+                columns[field] = [u.sectors[code] for code in u.sector_codes[rows].tolist()]
+            elif field == 'volume':
+                columns[field] = market['volume']
+            elif field in market:
+                columns[field] = market[field].round(2)
+            else:
+                raise ValueError(f"Unknown field: {field}")
+        return columns
+
+    def _quotes(self, snap, rows, fields=None):
+        """Build quote dicts for the given rows in one vectorized pass (optionally projected)"""
+        if len(rows) == 0:
+            return []
+
+        columns = self._quote_columns(snap, rows, fields)
+        fundamentals = {}
+        values = []
+        for field, column in columns.items():
+            source = FUNDAMENTAL_QUOTE_FIELDS.get(field)
+            if source is None:
+                values.append(column if isinstance(column, list) else column.tolist())
+            else:
+                if source not in fundamentals:
+                    fundamentals[source] = _nullable(column)
+                values.append(fundamentals[source])
+
+        return [dict(zip(columns, quote)) for quote in zip(*values)]
+
+    def _leaderboard(self, name, limit, sector=None):
+        """Quotes for a per-epoch leaderboard, optionally restricted to a sector"""
+        snap = self.snapshot()
+        sector_code = None
+        if sector:
+            sector_code = snap.universe.sector_code(sector)
+            if sector_code is None:
+                return []
+        return self._quotes(snap, snap.leaderboard(name, limit, sector_code))
+
     def get_stock_data(self, symbol):
         """Get real stock data by symbol"""
-        stock = get_stock_by_symbol(symbol)
-        if not stock:
+        snap = self.snapshot()
+        row = snap.universe.row_of(symbol)
+        if row is None:
             return None
-        
-        # Add slight price variation to simulate live market (±1%)
-        price_variation = random.uniform(-0.01, 0.01)
-        current_price = stock['price'] * (1 + price_variation)
-        
-        # Calculate change from base price
-        change = current_price - stock['price']
-        change_percent = (change / stock['price']) * 100
-        
-        return {
-            'symbol': stock['symbol'],
-            'name': stock['name'],
-            'price': round(current_price, 2),
-            'change': round(change, 2),
-            'changePercent': round(change_percent, 2),
-            'volume': random.randint(100000, 10000000),
-            'marketCap': stock['market_cap'],
-            'pe': stock['pe_ratio'],
-            'peRatio': stock['pe_ratio'],
-            'dividendYield': stock['dividend_yield'],
-            'week52High': round(current_price * random.uniform(1.1, 1.3), 2),
-            'week52Low': round(current_price * random.uniform(0.7, 0.9), 2),
-            'sector': stock['sector'],
-            'roce': stock['roce'],
-            'roe': stock['roce'],
-            'debtRatio': round(random.uniform(0.1, 1.5), 2),
-            'quarterlyProfit': stock['quarterly_profit'],
-            'profitGrowth': stock['profit_growth'],
-            'quarterlySales': stock['quarterly_sales'],
-            'salesGrowth': stock['sales_growth']
-        }
-    
+        return self._quotes(snap, [row])[0]
+
+    def get_stocks_batch(self, symbols):
+        """
+        Get stock data for many symbols from one snapshot
+        Returns (stocks, unknown): quotes in request order, plus the symbols
+        that did not resolve
+        """
+        snap = self.snapshot()
+        ids = snap.universe.registry.get_ids(symbols)
+
+        rows = [row for row in ids if row is not None]
+        unknown = [symbol for symbol, row in zip(symbols, ids) if row is None]
+        return self._quotes(snap, rows), unknown
+
     def get_all_stocks(self, limit=None):
         """Get all stocks with optional limit"""
-        all_stocks = []
-        symbols = self.symbols[:limit] if limit else self.symbols
-        
-        for symbol in symbols:
-            stock_data = self.get_stock_data(symbol)
-            if stock_data:
-                all_stocks.append(stock_data)
-        
-        return all_stocks
-    
-    def search_stocks(self, query):
-        """Search stocks by symbol or name"""
-        query = query.lower()
-        results = []
-        
-        for stock in self.stocks:
-            if (query in stock['symbol'].lower() or 
-                query in stock['name'].lower()):
-                stock_data = self.get_stock_data(stock['symbol'])
-                if stock_data:
-                    results.append(stock_data)
-        
-        return results[:10]  # Limit to 10 results
-    
+        snap = self.snapshot()
+        rows = np.arange(len(snap))
+        return self._quotes(snap, rows[:limit] if limit else rows)
+
+    def search_stocks(self, query, limit=10):
+        """Search stocks by symbol or name, best matches first"""
+        snap = self.snapshot()
+        rows = snap.universe.search_index.search(query, limit=limit)
+        return self._quotes(snap, rows)
+
     def filter_stocks(self, filters):
         """
         Filter stocks based on criteria
-        filters: dict with keys like 'minPrice', 'maxPrice', 'minPE', 'maxPE', 
+        filters: dict with keys like 'minPrice', 'maxPrice', 'minPE', 'maxPE',
                 'sector', 'minMarketCap', 'minDividendYield', etc.
+                (see services/screener_engine.py for the full spec)
         """
-        filtered = []
-        
-        for stock in self.stocks:
-            # Apply filters
-            if 'minPrice' in filters and stock['price'] < filters['minPrice']:
-                continue
-            if 'maxPrice' in filters and stock['price'] > filters['maxPrice']:
-                continue
-            if 'minPE' in filters and stock['pe_ratio'] and stock['pe_ratio'] < filters['minPE']:
-                continue
-            if 'maxPE' in filters and stock['pe_ratio'] and stock['pe_ratio'] > filters['maxPE']:
-                continue
-            if 'sector' in filters and stock['sector'] != filters['sector']:
-                continue
-            if 'minMarketCap' in filters and stock['market_cap'] < filters['minMarketCap']:
-                continue
-            if 'minDividendYield' in filters and stock['dividend_yield'] < filters['minDividendYield']:
-                continue
-            if 'minROCE' in filters and stock['roce'] < filters['minROCE']:
-                continue
-            
-            stock_data = self.get_stock_data(stock['symbol'])
-            if stock_data:
-                filtered.append(stock_data)
-        
-        return filtered
-    
+        return self.screen_stocks(filters)[0]
+
+    def screen_stocks(self, filters):
+        """Run a screener spec; returns (stocks, execution stats)"""
+        snap = self.snapshot()
+        rows, stats = screener_engine.run(filters, snap)
+        return self._quotes(snap, rows), stats
+
+    def _list_rows(self, query, filters=None, sector=None):
+        """Snapshot, page rows and page info for a list query"""
+        unknown = [field for field in query.fields or () if field not in QUOTE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        snap = query.snapshot(self.ticker)
+        u = snap.universe
+        stats = None
+
+        if filters is not None:
+            rows, stats = screener_engine.run(filters, snap)
+            query.bind(f"filter:{stats['plan']}")
+        elif sector is not None:
+            code = u.sector_code(sector)
+            query.bind(f"sector:{code}")
+            rows = [] if code is None else u.sector_index.rows(code)
+        else:
+            query.bind('all')
+            rows = np.arange(len(snap))
+
+        page_rows, page = query.page(snap, rows)
+        if stats is not None:
+            page['stats'] = stats
+        return snap, page_rows, page
+
+    def list_stocks(self, query, filters=None, sector=None):
+        """
+        One page of a stock list (all stocks, a screen, or a sector) as
+        described by a ListQuery; returns (stocks, page info)
+        """
+        snap, rows, page = self._list_rows(query, filters, sector)
+        return self._quotes(snap, rows, query.fields), page
+
+    def list_columns(self, query, filters=None, sector=None):
+        """Like list_stocks, but the page comes back as quote columns instead of dicts"""
+        snap, rows, page = self._list_rows(query, filters, sector)
+        return self._quote_columns(snap, rows, query.fields), page
+
+    def iter_stocks(self, query, filters=None, sector=None, chunk=STREAM_CHUNK_ROWS):
+        """
+        Like list_stocks, but quotes are built lazily in chunks of `chunk` rows;
+        returns (iterator of quote lists, page info)
+        """
+        snap, rows, page = self._list_rows(query, filters, sector)
+
+        def chunks():
+            for start in range(0, len(rows), chunk):
+                yield self._quotes(snap, rows[start:start + chunk], query.fields)
+        return chunks(), page
+
+    @staticmethod
+    def _changed_rows(previous, snap):
+        """Rows whose quotes differ between two snapshots, or None if they can't be compared"""
+        if previous is None or previous.universe is not snap.universe or previous.epoch > snap.epoch:
+            return None
+        changed = np.zeros(len(snap), dtype=bool)
+        for attr in CHANGE_ARRAYS:
+            before, after = getattr(previous, attr), getattr(snap, attr)
+            if attr != 'volume':
+                before, after = before.round(2), after.round(2)
+            changed |= before != after
+        return np.flatnonzero(changed)
+
+    def get_changes(self, since, symbols=None, fields=None):
+        """
+        Quotes that changed after epoch `since`, optionally limited to symbols.
+        Any worker can rebuild a recent epoch, so `since` may come from another
+        process. Falls back to every (requested) quote when `since` is outside
+        the ticker's window; returns (stocks, current epoch, full snapshot?)
+        """
+        fields = list(fields or CHANGE_FIELDS)
+        unknown = [field for field in fields if field not in QUOTE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        # Read `since` first so the response is labelled with the current snapshot
+        previous = self.ticker.snapshot_at(since) if since >= 0 else None
+        snap = self.snapshot()
+        rows = self._changed_rows(previous, snap)
+        full = rows is None
+        if full:
+            rows = np.arange(len(snap))
+
+        if symbols:
+            wanted = [row for row in snap.universe.registry.get_ids(symbols) if row is not None]
+            rows = np.intersect1d(rows, np.asarray(wanted, dtype=np.intp))
+        return self._quotes(snap, rows, fields), snap.epoch, full
+
     def get_historical_data(self, symbol, days=30):
-        """Generate historical price data"""
-        stock = get_stock_by_symbol(symbol)
-        if not stock:
+        """Get historical price data for the `days` days before today"""
+        bars = self.get_historical_bars(symbol, days)
+        return None if bars is None else to_records(bars)
+
+    def get_historical_bars(self, symbol, days=30):
+        """Historical bars for the `days` days before today as column arrays"""
+        u = self.universe
+        row = u.row_of(symbol)
+        if row is None:
             return None
-        
-        historical = []
-        current_price = stock['price']
-        
-        for i in range(days, 0, -1):
-            date = datetime.now() - timedelta(days=i)
-            # Generate realistic price movement (±2% daily)
-            daily_change = random.uniform(-0.02, 0.02)
-            price = current_price * (1 + daily_change)
-            
-            historical.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'open': round(price * random.uniform(0.98, 1.02), 2),
-                'high': round(price * random.uniform(1.00, 1.03), 2),
-                'low': round(price * random.uniform(0.97, 1.00), 2),
-                'close': round(price, 2),
-                'volume': random.randint(100000, 5000000)
-            })
-            
-            current_price = price
-        
-        return historical
-    
-    def get_top_gainers(self, limit=10):
+        return self._history(u, row, days)
+
+    def _history(self, u, row, days):
+        """Stored daily bars for a row, generating and persisting any that are missing"""
+        symbol = u.symbols[row]
+        sector = u.sectors[u.sector_codes[row]]
+        days = max(int(days), 0)
+        today = date.today()
+        yesterday = np.datetime64(today, 'D') - 1
+        start = yesterday - days + 1
+        store = self.history
+
+        last = store.last_date(symbol)
+        if last is None:
+            bars = generate_ohlcv(symbol, float(u.columns['price'][row]),
+                                  max(days, DEFAULT_HISTORY_DAYS), sector, today)
+            store.replace(symbol, bars)
+        else:
+            if last < yesterday:
+                # Continue the stored walk up to yesterday
+                previous_close = float(store.last(symbol, 1)['close'][0])
+                store.append(symbol, generate_ohlcv(symbol, previous_close, _days(yesterday - last),
+                                                    sector, today, anchor='start'))
+
+            first = store.first_date(symbol)
+            if days and first > start:
+                # Backfill older bars leading into the first stored one
+                first_open = float(store.range(symbol, end=first)['open'][0])
+                older = generate_ohlcv(symbol, first_open, _days(first - start), sector,
+                                       first.item(), anchor='end')
+                stored = store.range(symbol)
+                store.replace(symbol, {name: np.concatenate([older[name], stored[name]]) for name in stored})
+
+        return store.range(symbol, start=start, end=yesterday) if days else store.last(symbol, 0)
+
+    def get_top_gainers(self, limit=10, sector=None):
         """Get top gaining stocks"""
-        all_stocks = self.get_all_stocks()
-        sorted_stocks = sorted(all_stocks, key=lambda x: x['changePercent'], reverse=True)
-        return sorted_stocks[:limit]
-    
-    def get_top_losers(self, limit=10):
+        return self._leaderboard('gainers', limit, sector)
+
+    def get_top_losers(self, limit=10, sector=None):
         """Get top losing stocks"""
-        all_stocks = self.get_all_stocks()
-        sorted_stocks = sorted(all_stocks, key=lambda x: x['changePercent'])
-        return sorted_stocks[:limit]
-    
-    def get_most_active(self, limit=10):
+        return self._leaderboard('losers', limit, sector)
+
+    def get_most_active(self, limit=10, sector=None):
         """Get most active stocks by volume"""
-        all_stocks = self.get_all_stocks()
-        sorted_stocks = sorted(all_stocks, key=lambda x: x['volume'], reverse=True)
-        return sorted_stocks[:limit]
-    
+        return self._leaderboard('active', limit, sector)
+
     def get_sector_stocks(self, sector):
         """Get all stocks in a sector"""
-        sector_stocks = []
-        
-        for stock in self.stocks:
-            if stock['sector'].lower() == sector.lower():
-                stock_data = self.get_stock_data(stock['symbol'])
-                if stock_data:
-                    sector_stocks.append(stock_data)
-        
-        return sector_stocks
+        snap = self.snapshot()
+        code = snap.universe.sector_code(sector)
+        if code is None:
+            return []
+        return self._quotes(snap, snap.universe.sector_index.rows(code))
+
+    def get_sectors(self):
+        """Get sorted list of all sectors"""
+        return list(self.universe.sectors)
+
+    def get_sector_catalog(self):
+        """Sorted sectors with stock counts, plus the universe version they describe"""
+        u = self.universe
+        return u.sector_index.catalog(), u.version
 
 
 # Create singleton instance
@@ -0,0 +1,190 @@
+"""
+Sorting, pagination and field projection for list endpoints
+    ?sort=marketCap:desc      any numeric screener field, or symbol / name / sector
+    ?limit=25                 page size (omit for every row)
+    ?cursor=...               next page; pinned to the epoch (and sort) of the first page
+    ?fields=symbol,price,pe   quote fields to return
+Pages are cut with partial selection (only the rows up to the end of the page
+get sorted), and a cursor keeps reading the snapshot it was issued against so
+pages never shift while prices tick.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from services.screener_engine import NUMERIC_FIELDS
+
+TEXT_FIELDS = ('symbol', 'name', 'sector')
+
+TEXT_RANK_CACHE_SIZE = 16
+
+
+class CursorExpired(Exception):
+    """The snapshot a cursor was issued against is no longer retained"""
+
+
+_text_ranks = OrderedDict()
+_text_ranks_lock = threading.Lock()
+
+
+def _text_rank(universe, field):
+    """Case-insensitive sort rank of every row by a text field (cached per universe version)"""
+    key = (universe.version, field)
+    with _text_ranks_lock:
+        ranks = _text_ranks.get(key)
+        if ranks is not None:
+            _text_ranks.move_to_end(key)
+            return ranks
+
+    if field == 'sector':
+        names = np.array([name.lower() for name in universe.sectors], dtype=str)
+        ranks = np.empty(len(names), dtype=np.float64)
+        ranks[np.argsort(names, kind='stable')] = np.arange(len(names))
+        ranks = ranks[universe.sector_codes]
+    else:
+        values = universe.symbols if field == 'symbol' else universe.names
+        texts = np.array([value.lower() for value in values], dtype=str)
+        ranks = np.empty(len(texts), dtype=np.float64)
+        ranks[np.argsort(texts, kind='stable')] = np.arange(len(texts))
+
+    with _text_ranks_lock:
+        _text_ranks[key] = ranks
+        while len(_text_ranks) > TEXT_RANK_CACHE_SIZE:
+            _text_ranks.popitem(last=False)
+    return ranks
+
+
+def _sort_values(snap, field):
+    if field in TEXT_FIELDS:
+        return _text_rank(snap.universe, field)
+    source, column = NUMERIC_FIELDS[field]
+    values = snap.universe.columns[column] if source == 'universe' else getattr(snap, column)
+    return values.astype(np.float64, copy=False)
+
+
+def _parse_sort(value):
+    """'marketCap:desc' -> ('marketCap', True)"""
+    field, _, direction = value.partition(':')
+    field = field.strip()
+    direction = direction.strip().lower() or 'asc'
+    if field not in NUMERIC_FIELDS and field not in TEXT_FIELDS:
+        raise ValueError(f"Unknown sort field: {field}")
+    if direction not in ('asc', 'desc'):
+        raise ValueError(f"Sort direction must be 'asc' or 'desc', got {direction!r}")
+    return field, direction == 'desc'
+
+
+def _decode_cursor(cursor):
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode() + b'=' * (-len(cursor) % 4)))
+        return (int(state['e']), int(state['o']), int(state['l']), state.get('s'), str(state['q']),
+                state.get('v'))
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+class ListQuery:
+    def __init__(self, sort=None, descending=False, limit=None, fields=None,
+                 offset=0, epoch=None, digest=None, version=None):
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+        self.fields = fields
+        self.offset = offset
+        self.epoch = epoch
+        # Universe version the cursor's epoch was read against
+        self.version = version
+        self._cursor_digest = digest
+        self._scope = ''
+
+    @classmethod
+    def from_args(cls, args):
+        """Parse sort / limit / cursor / fields from request args (ValueError if malformed)"""
+        sort, descending = None, False
+        if args.get('sort'):
+            sort, descending = _parse_sort(args['sort'])
+
+        fields = None
+        if args.get('fields'):
+            fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+
+        limit = args.get('limit', type=int)
+        if limit is not None and limit <= 0:
+            raise ValueError("limit must be positive")
+
+        offset, epoch, digest, version = 0, None, None, None
+        if args.get('cursor'):
+            epoch, offset, cursor_limit, cursor_sort, digest, version = _decode_cursor(args['cursor'])
+            if offset < 0 or cursor_limit <= 0:
+                raise ValueError("Invalid cursor")
+            limit = limit or cursor_limit
+            # The cursor carries its sort; an explicit different one fails the digest check
+            if sort is None and cursor_sort:
+                sort, descending = _parse_sort(cursor_sort)
+
+        return cls(sort, descending, limit, fields, offset, epoch, digest, version)
+
+    def bind(self, scope):
+        """Tie the query to the rows it lists; a cursor from another query is rejected"""
+        self._scope = scope
+        if self._cursor_digest is not None and self._cursor_digest != self.digest:
+            raise ValueError("Cursor does not match this query")
+        return self
+
+    @property
+    def digest(self):
+        text = f"{self._scope}|{self.sort}|{self.descending}"
+        return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+    def snapshot(self, ticker):
+        """Snapshot to read: the cursor's epoch if continuing, else the current one"""
+        if self.epoch is None:
+            return ticker.snapshot()
+        # Any worker can rebuild a recent epoch, so the cursor works wherever it lands
+        snap = ticker.snapshot_at(self.epoch, self.version)
+        if snap is None:
+            raise CursorExpired("Cursor has expired; restart from the first page")
+        return snap
+
+    def page(self, snap, rows):
+        """
+        Rows for this page (in sort order) from the candidate rows (ascending row IDs),
+        plus the page info: total candidates and the cursor for the next page
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        total = len(rows)
+        start = min(self.offset, total)
+        end = total if self.limit is None else min(start + self.limit, total)
+
+        if self.sort is None:
+            page = rows[start:end]
+        else:
+            keys = _sort_values(snap, self.sort)[rows]
+            if self.descending:
+                keys = -keys
+            # Missing values sort last either way
+            keys = np.where(np.isnan(keys), np.inf, keys)
+
+            # Partial selection: everything up to the page's last key, ties included
+            if end < total:
+                kth = np.partition(keys, end - 1)[end - 1]
+                top = np.flatnonzero(keys <= kth)
+            else:
+                top = np.arange(total)
+            top = top[np.lexsort((top, keys[top]))]
+            page = rows[top[start:end]]
+
+        next_cursor = None
+        if end < total:
+            state = {'e': snap.epoch, 'v': snap.universe.version, 'o': end, 'l': self.limit, 'q': self.digest}
+            if self.sort is not None:
+                state['s'] = f"{self.sort}:{'desc' if self.descending else 'asc'}"
+            next_cursor = base64.urlsafe_b64encode(
+                json.dumps(state, separators=(',', ':')).encode()).decode().rstrip('=')
+
+        return page, {'total': total, 'epoch': snap.epoch, 'nextCursor': next_cursor}
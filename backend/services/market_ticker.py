@@ -0,0 +1,439 @@
+"""
+Shared market tick engine
+Publishes immutable snapshots of simulated prices for the whole universe,
+numbered by epoch, so every endpoint reads the same prices until the next tick.
+
+Epochs come from the wall clock (one per tick interval) and a snapshot is a
+pure function of the universe and its epoch: every symbol's random walk is
+drawn from a counter-based hash of (symbol, epoch). Every worker process
+therefore computes the same prices for the same epoch without coordinating,
+and any recent epoch can be rebuilt on demand for pagination cursors and the
+change feed.
+
+Symbols with a live quote (see QuoteRefresher) hold that quote instead of
+being simulated. Quotes are shared between processes through a small JSON
+file and take effect QUOTE_DELAY epochs after they are published, so all
+workers switch over on the same tick.
+"""
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime
+
+import numpy as np
+from flask import g, has_request_context
+
+from services.file_lock import file_lock
+from services.rate_limiter import DEFAULT_CACHE_PATH
+from services.universe_manager import universe_manager
+
+# Max drift from the reference price (±1%, as the per-request simulation had)
+MAX_VARIATION = 0.01
+
+# Recently built snapshots kept in memory
+RETAINED_SNAPSHOTS = int(os.getenv('MARKET_SNAPSHOT_RETENTION', 60))
+
+# Epochs back from the current one that stay readable (rebuilt when no longer retained)
+SNAPSHOT_WINDOW = int(os.getenv('MARKET_SNAPSHOT_WINDOW', 600))
+
+# A symbol that has not traded for this many ticks counts as having traded at the start of them
+ACTIVITY_LOOKBACK = 64
+
+# Ticks between the random walk's knots (prices ease from one knot to the next)
+WALK_KNOT_TICKS = 60
+
+# Epochs between publishing a live quote and it taking effect in every worker
+QUOTE_DELAY = 2
+
+DEFAULT_QUOTES_PATH = os.path.join(DEFAULT_CACHE_PATH, 'market_quotes.json')
+
+# Random streams drawn per symbol
+_VOLUME, _HIGH, _LOW, _DEBT, _RATE, _ACTIVE, _KNOT, _JITTER = range(8)
+
+# Leaderboard name -> (snapshot field, descending)
+LEADERBOARDS = {
+    'gainers': ('change_percent', True),
+    'losers': ('change_percent', False),
+    'active': ('volume', True),
+}
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+def _mix(x):
+    """splitmix64 finalizer over a uint64 array (wraps on overflow)"""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _uniform(keys, stream, epoch=0):
+    """Uniforms in [0, 1) per symbol key for (stream, epoch); epoch may be one per key"""
+    counter = np.atleast_1d(np.asarray(epoch, dtype=np.int64)).astype(np.uint64)
+    bits = _mix(keys ^ _mix(counter * np.uint64(16) + np.uint64(stream)))
+    return (bits >> np.uint64(11)) * (1.0 / (1 << 53))
+
+
+def _mark_read(snapshot):
+    """Remember the snapshot a request read, for its X-Universe-Version / X-Market-Epoch headers"""
+    if snapshot is not None and has_request_context():
+        g.market_snapshot = (snapshot.universe.version, snapshot.epoch)
+    return snapshot
+
+
+class MarketSnapshot:
+    """Prices for one universe version at one epoch; arrays are read-only"""
+
+    def __init__(self, epoch, universe, variation, volume, week52_high, week52_low,
+                 debt_ratio, base_volume, trading_day, timestamp=None, reference=None, live=None,
+                 traded=None):
+        self.epoch = epoch
+        self.universe = universe
+        self.timestamp = timestamp or time.time()
+        self.trading_day = trading_day
+
+        # Price changes are measured from the reference (previous close for live quotes)
+        base = universe.columns['price'] if reference is None else reference
+        self.reference = _frozen(base.view())
+        self.live = _frozen(np.zeros(len(base), dtype=bool) if live is None else live)
+        self.variation = _frozen(variation)
+        self.price = _frozen(base * (1 + variation))
+        self.change = _frozen(self.price - base)
+        self.change_percent = _frozen(variation * 100)
+        self.volume = _frozen(volume)
+        self.base_volume = _frozen(base_volume)
+        self.week52_high = _frozen(np.maximum(week52_high, self.price))
+        self.week52_low = _frozen(np.minimum(week52_low, self.price))
+        self.debt_ratio = _frozen(debt_ratio)
+        # Epoch each row last traded at (lets the next epoch be built incrementally)
+        self.traded = traded
+
+        self._leaderboards = {}
+        self._leaderboard_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.price)
+
+    def market(self, rows):
+        """Live market fields for the given rows, keyed by quote field name"""
+        return {
+            'price': self.price[rows],
+            'change': self.change[rows],
+            'changePercent': self.change_percent[rows],
+            'volume': self.volume[rows],
+            'week52High': self.week52_high[rows],
+            'week52Low': self.week52_low[rows],
+            'debtRatio': self.debt_ratio[rows],
+        }
+
+    def leaderboard(self, name, limit=10, sector_code=None):
+        """
+        Top rows for a leaderboard ('gainers', 'losers', 'active'), optionally
+        within one sector. Computed with partial selection on first use and
+        shared by every caller reading this epoch.
+        """
+        if limit is None or limit <= 0:
+            return np.empty(0, dtype=np.intp)
+
+        key = (name, sector_code)
+        ranked = self._leaderboards.get(key)
+        if ranked is None or not self._covers(ranked, limit):
+            with self._leaderboard_lock:
+                ranked = self._leaderboards.get(key)
+                if ranked is None or not self._covers(ranked, limit):
+                    ranked = self._rank(name, max(limit, 10), sector_code)
+                    self._leaderboards[key] = ranked
+        return ranked[0][:limit]
+
+    @staticmethod
+    def _covers(ranked, limit):
+        rows, complete = ranked
+        return complete or len(rows) >= limit
+
+    def _rank(self, name, k, sector_code):
+        """(top k rows in rank order, whether that is every candidate)"""
+        field, descending = LEADERBOARDS[name]
+        if sector_code is None:
+            candidates = np.arange(len(self))
+        else:
+            candidates = self.universe.sector_index.rows(sector_code)
+
+        values = getattr(self, field)[candidates]
+        if descending:
+            values = -values
+
+        # argpartition picks the k best in O(n); only those k get sorted
+        if k < len(candidates):
+            top = np.argpartition(values, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.lexsort((candidates[top], values[top]))]
+
+        return candidates[top], k >= len(candidates)
+
+
+class MarketTicker:
+    def __init__(self, manager=universe_manager, interval=None, activity=None, seed=None,
+                 retain=RETAINED_SNAPSHOTS, window=SNAPSHOT_WINDOW, quotes_path=None):
+        self.manager = manager
+        self.interval = float(os.getenv('MARKET_TICK_INTERVAL', 1.0)) if interval is None else interval
+        # Fraction of symbols that trade on any given tick
+        self.activity = float(os.getenv('MARKET_TICK_ACTIVITY', 0.3)) if activity is None else activity
+        # Every process must use the same seed to see the same market
+        self.seed = int(seed or 0) & 0xFFFFFFFF
+        self.window = max(int(window), 1)
+        self.quotes_path = quotes_path or DEFAULT_QUOTES_PATH
+        self._lock = threading.Lock()
+        self.retain = max(int(retain), 1)
+        self._retained = OrderedDict()
+        self._listeners = []
+        # (universe, per-symbol parameters) for the current universe
+        self._params_cache = None
+        # (file stamp, published quotes) as last read from quotes_path
+        self._quotes_cache = (None, {})
+        # First epoch this process read the current universe at, if it was reloaded
+        self._universe_since = None
+        universe = manager.current()
+        self._snapshot = self._build(universe, self._current_epoch())
+        self._retained[self._snapshot.epoch] = self._snapshot
+
+    @property
+    def epoch(self):
+        """Epoch of the last published snapshot (does not advance the market)"""
+        return self._snapshot.epoch
+
+    def _current_epoch(self):
+        return int(time.time() // self.interval)
+
+    def snapshot(self):
+        """Current snapshot, ticking first if a new epoch has started"""
+        return _mark_read(self._current())
+
+    def _current(self):
+        snapshot = self._snapshot
+        if self._due(snapshot):
+            with self._lock:
+                snapshot = self._snapshot
+                if self._due(snapshot):
+                    snapshot = self._publish(self._build(self.manager.current(), self._current_epoch(), snapshot))
+        return snapshot
+
+    def _due(self, snapshot):
+        return snapshot.universe is not self.manager.current() or self._current_epoch() > snapshot.epoch
+
+    def apply_quotes(self, quotes):
+        """
+        Publish external quotes ({symbol: {'price', 'volume', 'previousClose', ...}})
+        to every worker. Quoted symbols stop being simulated QUOTE_DELAY epochs
+        from now and keep the quoted price until the next quote; returns the
+        number of symbols applied.
+        """
+        universe = self.manager.current()
+        effective = self._current_epoch() + QUOTE_DELAY
+        entries = {}
+        for row, quote in zip(universe.registry.get_ids(list(quotes)), quotes.values()):
+            price = quote.get('price') or 0
+            if row is None or price <= 0:
+                continue
+            close = quote.get('previousClose') or price - quote.get('change', 0)
+            volume = quote.get('volume')
+            entries[universe.symbols[row]] = [effective, float(price), float(close if close > 0 else price),
+                                              None if volume is None else int(volume)]
+        if not entries:
+            return 0
+
+        with file_lock(self.quotes_path + '.lock'):
+            published = self._read_quotes()
+            for symbol, entry in entries.items():
+                history = published.setdefault(symbol, [])
+                if history and history[-1][1:] == entry[1:]:
+                    continue  # Already published (e.g. by another worker); keep its epoch
+                history.append(entry)
+                # Keep the entries epochs in the readable window still need
+                while len(history) > 1 and history[1][0] <= effective - self.window:
+                    history.pop(0)
+            self._write_quotes(published)
+        return len(entries)
+
+    def _read_quotes(self):
+        try:
+            with open(self.quotes_path) as f:
+                published = json.load(f)
+            if isinstance(published, dict):
+                return published
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _write_quotes(self, published):
+        os.makedirs(os.path.dirname(self.quotes_path) or '.', exist_ok=True)
+        tmp = f"{self.quotes_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(published, f, separators=(',', ':'))
+        os.replace(tmp, self.quotes_path)
+
+    def _published_quotes(self):
+        """{symbol: [[effective epoch, price, reference, volume], ...]}, re-read when the file changes"""
+        try:
+            stat = os.stat(self.quotes_path)
+        except OSError:
+            return {}
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached_stamp, published = self._quotes_cache
+        if cached_stamp != stamp:
+            published = self._read_quotes()
+            self._quotes_cache = (stamp, published)
+        return published
+
+    def _publish(self, snapshot):
+        """Make snapshot current (caller holds the lock)"""
+        previous = self._snapshot
+        if previous.universe is not snapshot.universe:
+            self._universe_since = snapshot.epoch
+        self._retain(snapshot)
+        self._snapshot = snapshot
+        self._notify(previous, snapshot)
+        return snapshot
+
+    def _retain(self, snapshot):
+        self._retained[snapshot.epoch] = snapshot
+        while len(self._retained) > self.retain:
+            self._retained.popitem(last=False)
+
+    def add_listener(self, callback):
+        """Call callback(previous, snapshot) for every published tick, in epoch order"""
+        self._listeners.append(callback)
+
+    def _notify(self, previous, snapshot):
+        for callback in self._listeners:
+            try:
+                callback(previous, snapshot)
+            except Exception as e:
+                print(f"Error in tick listener: {str(e)}")
+
+    def snapshot_at(self, epoch, version=None):
+        """
+        The snapshot at a recent epoch (rebuilt if it is no longer retained), or
+        None once it is outside the window or belongs to another universe version
+        """
+        current = self._current()
+        snapshot = current if current.epoch == epoch else self._retained.get(epoch)
+        if snapshot is None and self._readable(epoch, current):
+            snapshot = self._build(current.universe, epoch)
+            with self._lock:
+                self._retain(snapshot)
+        if snapshot is not None and version is not None and snapshot.universe.version != version:
+            return None
+        return _mark_read(snapshot)
+
+    def _readable(self, epoch, current):
+        if not current.epoch - self.window < epoch <= current.epoch:
+            return False
+        # Epochs before a reload were priced against a universe this process no longer has
+        return self._universe_since is None or epoch >= self._universe_since
+
+    def _params(self, universe):
+        """Per-symbol walk parameters, derived from the symbols so every process agrees"""
+        cached = self._params_cache
+        if cached is not None and cached[0] is universe:
+            return cached[1]
+
+        codes = np.array([zlib.crc32(symbol.encode()) for symbol in universe.symbols], dtype=np.uint64)
+        keys = _mix(codes ^ np.uint64(self.seed << 32))
+        params = {
+            'keys': keys,
+            'base_volume': 100000 + (_uniform(keys, _VOLUME) * 9900000).astype(np.int64),
+            'high': 1.1 + _uniform(keys, _HIGH) * 0.2,
+            'low': 0.7 + _uniform(keys, _LOW) * 0.2,
+            'debt_ratio': 0.1 + _uniform(keys, _DEBT) * 1.4,
+            # Shares added to the day's volume each time the symbol trades
+            'rate': 100 + (_uniform(keys, _RATE) * 19900).astype(np.int64),
+        }
+        self._params_cache = (universe, params)
+        return params
+
+    def _traded(self, keys, epoch, previous=None):
+        """Epoch each row last traded at, looking back at most ACTIVITY_LOOKBACK ticks"""
+        floor = epoch - ACTIVITY_LOOKBACK
+        if previous is not None:
+            # The previous epoch's answer plus this tick gives the same result as a full scan
+            traded = np.maximum(previous, floor)
+            traded[_uniform(keys, _ACTIVE, epoch) < self.activity] = epoch
+            return traded
+
+        traded = np.full(len(keys), floor, dtype=np.int64)
+        for tick in range(floor + 1, epoch + 1):
+            traded[_uniform(keys, _ACTIVE, tick) < self.activity] = tick
+        return traded
+
+    @staticmethod
+    def _walk(keys, traded):
+        """Variation from the reference price as of each row's last trade"""
+        knot, offset = np.divmod(traded, WALK_KNOT_TICKS)
+        start = _uniform(keys, _KNOT, knot) * 2 - 1
+        end = _uniform(keys, _KNOT, knot + 1) * 2 - 1
+        t = offset / WALK_KNOT_TICKS
+        t = t * t * (3 - 2 * t)
+        jitter = _uniform(keys, _JITTER, traded) * 2 - 1
+        return (start + (end - start) * t) * (0.8 * MAX_VARIATION) + jitter * (0.2 * MAX_VARIATION)
+
+    def _day_start(self, trading_day):
+        """First epoch of a (local) trading day"""
+        return int(datetime.combine(trading_day, datetime.min.time()).timestamp() // self.interval)
+
+    def _build(self, universe, epoch, previous=None):
+        """The snapshot of a universe at an epoch (incremental from the epoch before, if given)"""
+        params = self._params(universe)
+        keys = params['keys']
+        chained = previous is not None and previous.universe is universe and previous.epoch == epoch - 1
+        traded = self._traded(keys, epoch, previous.traded if chained else None)
+        variation = self._walk(keys, traded)
+
+        trading_day = date.fromtimestamp(epoch * self.interval)
+        # Volume is cumulative for the trading day: about `activity` trades per tick so far
+        ticks = np.maximum(traded - self._day_start(trading_day), 0)
+        volume = params['base_volume'] + (params['rate'] * ticks * self.activity).astype(np.int64)
+
+        # Live quotes in effect at this epoch replace the simulation for their rows
+        reference = universe.columns['price'].astype(np.float64)
+        live = np.zeros(len(universe), dtype=bool)
+        published = self._published_quotes()
+        if published:
+            symbols = list(published)
+            for row, history in zip(universe.registry.get_ids(symbols), published.values()):
+                entry = next((entry for entry in reversed(history) if entry[0] <= epoch), None)
+                if row is None or entry is None:
+                    continue
+                _, price, close, quoted_volume = entry
+                reference[row] = close
+                variation[row] = price / close - 1
+                if quoted_volume is not None:
+                    volume[row] = quoted_volume
+                live[row] = True
+
+        return MarketSnapshot(
+            epoch=epoch,
+            universe=universe,
+            variation=variation,
+            volume=volume,
+            week52_high=reference * params['high'],
+            week52_low=reference * params['low'],
+            debt_ratio=params['debt_ratio'],
+            base_volume=params['base_volume'],
+            trading_day=trading_day,
+            timestamp=epoch * self.interval,
+            reference=reference,
+            live=live,
+            traded=traded,
+        )
+
+
+# Global instance
+market_ticker = MarketTicker()
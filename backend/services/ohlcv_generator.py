@@ -0,0 +1,102 @@
+"""
+Vectorized historical OHLCV generator
+Geometric Brownian motion with per-sector daily volatility, seeded by
+(symbol, end date) so the same chart request returns the same bars all day.
+"""
+import hashlib
+from datetime import date, timedelta
+
+import numpy as np
+
+# Daily volatility (sigma of log returns) by sector
+SECTOR_VOLATILITY = {
+    'Auto': 0.017,
+    'Banking': 0.016,
+    'Cement': 0.016,
+    'Chemicals': 0.019,
+    'Consumer Durables': 0.017,
+    'Diversified': 0.024,
+    'Energy': 0.016,
+    'FMCG': 0.011,
+    'Financial Services': 0.019,
+    'IT': 0.015,
+    'Infrastructure': 0.018,
+    'Media': 0.022,
+    'Metals': 0.022,
+    'Mining': 0.021,
+    'Paints': 0.014,
+    'Pharma': 0.014,
+    'Power': 0.019,
+    'Real Estate': 0.023,
+    'Retail': 0.018,
+    'Telecom': 0.018,
+}
+DEFAULT_VOLATILITY = 0.018
+
+# Annual drift, applied per trading day
+DAILY_DRIFT = 0.10 / 252
+
+
+def _seed(symbol, end):
+    digest = hashlib.sha256(f"{symbol}:{end.isoformat()}".encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def generate_ohlcv(symbol, close, days, sector=None, end=None, anchor='end'):
+    """
+    Generate `days` daily bars ending the day before `end` (default today).
+    anchor='end' makes the last close equal `close`; anchor='start' treats
+    `close` as the previous close the series continues from.
+    Returns a dict of arrays: date (datetime64[D]), open, high, low, close, volume
+    """
+    end = end or date.today()
+    days = max(int(days), 0)
+    sigma = SECTOR_VOLATILITY.get(sector, DEFAULT_VOLATILITY)
+    rng = np.random.default_rng(_seed(symbol, end))
+
+    returns = rng.normal(DAILY_DRIFT - sigma ** 2 / 2, sigma, days)
+    log_path = np.cumsum(returns)
+    if anchor == 'end' and days:
+        log_path -= log_path[-1]
+    closes = close * np.exp(log_path)
+
+    # Each bar opens with a small gap from the previous close
+    previous_close = np.empty(days)
+    if days:
+        previous_close[0] = closes[0] * np.exp(-returns[0])
+        previous_close[1:] = closes[:-1]
+    opens = previous_close * np.exp(rng.normal(0, sigma * 0.3, days))
+
+    highs = np.maximum(opens, closes) * np.exp(np.abs(rng.normal(0, sigma * 0.5, days)))
+    lows = np.minimum(opens, closes) * np.exp(-np.abs(rng.normal(0, sigma * 0.5, days)))
+
+    first = np.datetime64(end - timedelta(days=days), 'D')
+    return {
+        'date': first + np.arange(days),
+        'open': opens,
+        'high': highs,
+        'low': lows,
+        'close': closes,
+        'volume': rng.integers(100000, 5000000, days),
+    }
+
+
+def to_records(bars):
+    """Column arrays -> list of bar dicts (prices rounded to 2 decimals)"""
+    return [
+        {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+        for d, o, h, l, c, v in zip(
+            np.datetime_as_string(bars['date'], unit='D').tolist(),
+            np.round(bars['open'], 2).tolist(),
+            np.round(bars['high'], 2).tolist(),
+            np.round(bars['low'], 2).tolist(),
+            np.round(bars['close'], 2).tolist(),
+            np.asarray(bars['volume']).tolist(),
+        )
+    ]
+
+
+def iter_records(bars, chunk=500):
+    """to_records in chunks of `chunk` bars, for streaming long histories"""
+    for start in range(0, len(bars['date']), chunk):
+        yield to_records({name: values[start:start + chunk] for name, values in bars.items()})
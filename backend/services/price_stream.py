@@ -0,0 +1,194 @@
+"""
+Live price push channel
+One broadcaster thread watches the market ticker; on each new epoch it
+computes which fields changed for which rows in a single vectorized pass and
+fans the per-symbol deltas out to subscribers. Every subscriber has a bounded
+queue: when a slow consumer falls behind, new deltas are merged into the last
+queued one instead of growing the queue, so it still ends up with the latest
+values.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from services.market_ticker import market_ticker
+
+# Quote field -> snapshot array streamed as deltas
+STREAM_FIELDS = {
+    'price': 'price',
+    'change': 'change',
+    'changePercent': 'change_percent',
+    'volume': 'volume',
+    'week52High': 'week52_high',
+    'week52Low': 'week52_low',
+}
+
+SUBSCRIBER_QUEUE_SIZE = 32
+
+# Max symbols in one subscription
+MAX_STREAM_SYMBOLS = 500
+
+# Open streams per worker process; each holds a request thread (see gunicorn.conf.py),
+# so this stays below the thread count and leaves room for regular requests
+MAX_SUBSCRIBERS = int(os.getenv('PRICE_STREAM_MAX_SUBSCRIBERS', 16))
+
+
+class StreamsFull(Exception):
+    """Every stream slot in this worker is taken; clients should poll instead"""
+
+
+def _field_values(snap, attr, rows):
+    values = getattr(snap, attr)[rows]
+    return values.tolist() if attr == 'volume' else values.round(2).tolist()
+
+
+class Subscription:
+    def __init__(self, symbols, max_queue=SUBSCRIBER_QUEUE_SIZE):
+        self.symbols = symbols
+        self.max_queue = max_queue
+        self.coalesced = 0
+        # Gets every streamed field on its first broadcast, deltas after that
+        self.fresh = True
+        self._events = deque()
+        self._cond = threading.Condition()
+        # Rows of `symbols` in a universe version: (universe, rows, symbols)
+        self._binding = None
+
+    def rows_for(self, universe):
+        """Resolved rows (and their symbols) of this subscription in a universe"""
+        binding = self._binding
+        if binding is None or binding[0] is not universe:
+            ids = universe.registry.get_ids(self.symbols)
+            rows = [row for row in ids if row is not None]
+            binding = (universe, rows, [universe.symbols[row] for row in rows])
+            self._binding = binding
+        return binding[1], binding[2]
+
+    def publish(self, epoch, delta):
+        """Queue a delta; merge it into the last one if the queue is full"""
+        with self._cond:
+            if len(self._events) >= self.max_queue:
+                _, pending = self._events.pop()
+                # Field dicts are shared between subscribers; merge into copies
+                merged = {symbol: dict(fields) for symbol, fields in pending.items()}
+                for symbol, fields in delta.items():
+                    merged.setdefault(symbol, {}).update(fields)
+                delta = merged
+                self.coalesced += 1
+            self._events.append((epoch, delta))
+            self._cond.notify()
+
+    def next(self, timeout=None):
+        """Next (epoch, delta), or None if nothing arrived within `timeout`"""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            if not self._events:
+                return None
+            return self._events.popleft()
+
+
+class PriceBroadcaster:
+    def __init__(self, ticker=market_ticker, max_subscribers=MAX_SUBSCRIBERS):
+        self.ticker = ticker
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last = None
+
+    def subscribe(self, symbols):
+        """Register a subscription for symbols (starts the broadcaster on first use)"""
+        if len(symbols) > MAX_STREAM_SYMBOLS:
+            raise ValueError(f"At most {MAX_STREAM_SYMBOLS} symbols per stream")
+        subscription = Subscription(symbols)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise StreamsFull(f"All {self.max_subscribers} price streams are in use; poll /api/stocks/data instead")
+            self._subscribers.add(subscription)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='price-broadcaster', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _run(self):
+        while True:
+            time.sleep(max(self.ticker.interval, 0.1))
+            with self._lock:
+                subscribers = list(self._subscribers)
+            if not subscribers:
+                self._last = None
+                continue
+            try:
+                self.broadcast(subscribers)
+            except Exception as e:
+                print(f"Error broadcasting prices: {str(e)}")
+
+    def broadcast(self, subscribers):
+        """Publish the changes since the last broadcast snapshot to subscribers"""
+        snap = self.ticker.snapshot()
+        previous = self._last
+        changes = None
+        if previous is None or previous.epoch != snap.epoch or previous.universe is not snap.universe:
+            changes = self._changes(previous, snap)
+            self._last = snap
+
+        for subscription in subscribers:
+            rows, symbols = subscription.rows_for(snap.universe)
+            if subscription.fresh:
+                subscription.fresh = False
+                delta = self._values(snap, rows, symbols)
+            elif changes:
+                delta = {symbol: changes[row] for row, symbol in zip(rows, symbols) if row in changes}
+            else:
+                continue
+            if delta:
+                subscription.publish(snap.epoch, delta)
+
+    @staticmethod
+    def _values(snap, rows, symbols):
+        """symbol -> every streamed field, for a subscription's first event"""
+        rows = np.asarray(rows, dtype=np.intp)
+        columns = [_field_values(snap, attr, rows) for attr in STREAM_FIELDS.values()]
+        return {symbol: dict(zip(STREAM_FIELDS, values)) for symbol, *values in zip(symbols, *columns)}
+
+    @staticmethod
+    def _changes(previous, snap):
+        """row -> {field: value} for every field that changed since `previous`"""
+        if previous is None:
+            # Nobody was subscribed; everyone gets full values as a fresh subscriber
+            return {}
+        if previous.universe is not snap.universe:
+            rows = np.arange(len(snap))
+            masks = {field: np.ones(len(rows), dtype=bool) for field in STREAM_FIELDS}
+        else:
+            masks = {}
+            for field, attr in STREAM_FIELDS.items():
+                before, after = getattr(previous, attr), getattr(snap, attr)
+                if attr != 'volume':
+                    before, after = before.round(2), after.round(2)
+                masks[field] = before != after
+            rows = np.flatnonzero(np.logical_or.reduce(list(masks.values())))
+            masks = {field: mask[rows] for field, mask in masks.items()}
+
+        changes = {row: {} for row in rows.tolist()}
+        for field, attr in STREAM_FIELDS.items():
+            field_rows = rows[masks[field]]
+            for row, value in zip(field_rows.tolist(), _field_values(snap, attr, field_rows)):
+                changes[row][field] = value
+        return changes
+
+
+# Global instance
+price_broadcaster = PriceBroadcaster()
@@ -0,0 +1,185 @@
+"""
+Demand-driven background quote refresher
+One thread per worker process spends the shared Alpha Vantage budget. It ranks
+symbols by demand (portfolio holdings, watchlists, recent requests) weighted by
+how stale their last quote is, fetches the most urgent one as soon as the rate
+limiter grants a token, and publishes it into the market ticker. Request
+handlers only read ticker snapshots, so no request ever waits on the external API.
+
+Refreshes are serialized across processes with a file lock, and a quote that
+another process fetched recently is taken from the shared cache instead of
+being fetched again.
+"""
+import os
+import threading
+import time
+
+from services.alpha_vantage_service import CACHE_TTLS, alpha_vantage
+from services.file_lock import file_lock
+from services.market_ticker import market_ticker
+from services.supabase_client import supabase
+from services.universe_manager import universe_manager
+
+# Demand weights: a holding counts as this many recent requests
+HOLDING_WEIGHT = 5.0
+WATCHLIST_WEIGHT = 3.0
+
+# Recent request counts halve every REQUEST_HALF_LIFE seconds
+REQUEST_HALF_LIFE = 15 * 60
+
+# A quote younger than this is fresh and not refreshed
+QUOTE_MAX_AGE = CACHE_TTLS['quote'][0]
+
+# Staleness stops growing after a day, so demand still decides between old quotes
+MAX_STALENESS = 24 * 3600 / QUOTE_MAX_AGE
+
+# Seconds between reloads of holdings and watchlists
+DEMAND_RELOAD_INTERVAL = 300
+
+# Seconds to sleep when every demanded quote is fresh
+IDLE_WAIT = 1.0
+
+# Universe symbol -> Alpha Vantage symbol (NSE/BSE listings need an exchange suffix)
+SYMBOL_SUFFIX = os.getenv('ALPHA_VANTAGE_SYMBOL_SUFFIX', '.BSE')
+
+
+class QuoteRefresher:
+    def __init__(self, service=alpha_vantage, ticker=market_ticker, manager=universe_manager, client=supabase):
+        self.service = service
+        self.ticker = ticker
+        self.manager = manager
+        self.client = client
+        self.refreshed = 0
+        self._lock = threading.Lock()
+        # symbol -> (decayed request count, time of last update)
+        self._requests = {}
+        self._holdings = frozenset()
+        self._watchlist = frozenset()
+        self._demand_loaded_at = 0
+        # symbol -> time its published quote was fetched
+        self._quoted_at = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record_request(self, symbols):
+        """Count a request for symbols (unknown symbols are ignored)"""
+        universe = self.manager.current()
+        now = time.time()
+        with self._lock:
+            for row in universe.registry.get_ids([s for s in symbols if isinstance(s, str)]):
+                if row is None:
+                    continue
+                symbol = universe.symbols[row]
+                count, at = self._requests.get(symbol, (0.0, now))
+                self._requests[symbol] = (self._decayed(count, at, now) + 1, now)
+
+    def set_demand(self, holdings=(), watchlist=()):
+        """Replace the held and watched symbol sets (symbols outside the universe are ignored)"""
+        registry = self.manager.current().registry
+        holdings = frozenset(filter(None, (registry.resolve(s) for s in holdings if isinstance(s, str))))
+        watchlist = frozenset(filter(None, (registry.resolve(s) for s in watchlist if isinstance(s, str))))
+        with self._lock:
+            self._holdings = holdings
+            self._watchlist = watchlist
+            self._demand_loaded_at = time.time()
+
+    def load_demand(self):
+        """Reload held and watched symbols from Supabase"""
+        self._demand_loaded_at = time.time()
+        if self.client is None:
+            return
+        try:
+            holdings = self.client.table('portfolio').select('symbol').execute().data or []
+            watchlist = self.client.table('watchlist').select('symbol').execute().data or []
+            self.set_demand([row.get('symbol') for row in holdings], [row.get('symbol') for row in watchlist])
+        except Exception as e:
+            print(f"Error loading quote demand: {str(e)}")
+
+    @staticmethod
+    def _decayed(count, at, now):
+        return count * 0.5 ** ((now - at) / REQUEST_HALF_LIFE)
+
+    def priorities(self, now=None):
+        """[(priority, symbol)] for symbols whose quote is stale, most urgent first"""
+        now = time.time() if now is None else now
+        with self._lock:
+            demand = {}
+            for symbol, (count, at) in list(self._requests.items()):
+                count = self._decayed(count, at, now)
+                if count < 0.01:
+                    del self._requests[symbol]
+                    continue
+                demand[symbol] = count
+            for symbol in self._holdings:
+                demand[symbol] = demand.get(symbol, 0) + HOLDING_WEIGHT
+            for symbol in self._watchlist:
+                demand[symbol] = demand.get(symbol, 0) + WATCHLIST_WEIGHT
+            quoted_at = dict(self._quoted_at)
+
+        ranked = []
+        for symbol, weight in demand.items():
+            at = quoted_at.get(symbol)
+            staleness = MAX_STALENESS if at is None else min((now - at) / QUOTE_MAX_AGE, MAX_STALENESS)
+            if staleness >= 1:
+                ranked.append((weight * staleness, symbol))
+        ranked.sort(reverse=True)
+        return ranked
+
+    def refresh_once(self, wait=None):
+        """Refresh the most urgent symbol; returns it, or None when every quote is fresh"""
+        ranked = self.priorities()
+        if not ranked:
+            return None
+        symbol = ranked[0][1]
+        remote = symbol + SYMBOL_SUFFIX
+
+        # One refresher at a time across workers, so the others find its quote in the cache
+        with file_lock(os.path.join(os.path.dirname(self.service.cache.path), 'quote_refresher.lock')):
+            hit = self.service.cache.get('quote', remote)
+            if hit is not None:
+                quote, age = hit
+                # Fresh from another worker, or the best we have until the refresh lands
+                if age < QUOTE_MAX_AGE or symbol not in self._quoted_at:
+                    self._publish(symbol, quote, time.time() - age)
+                if age < QUOTE_MAX_AGE:
+                    return symbol
+
+            quote = self.service.refresh_quote(remote, wait)
+        # Failed fetches also wait out QUOTE_MAX_AGE, so one bad symbol can't starve the rest
+        self._publish(symbol, quote, time.time())
+        if quote:
+            self.refreshed += 1
+        return symbol
+
+    def _publish(self, symbol, quote, fetched_at):
+        with self._lock:
+            self._quoted_at[symbol] = fetched_at
+        if quote:
+            self.ticker.apply_quotes({symbol: quote})
+
+    def start(self):
+        """Refresh quotes in a background thread until stop()"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    if time.time() - self._demand_loaded_at >= DEMAND_RELOAD_INTERVAL:
+                        self.load_demand()
+                    if self.refresh_once() is None:
+                        self._stop.wait(IDLE_WAIT)
+                except Exception as e:
+                    print(f"Error refreshing quotes: {str(e)}")
+                    self._stop.wait(IDLE_WAIT)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='quote-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+# Global instance
+quote_refresher = QuoteRefresher()
@@ -0,0 +1,104 @@
+"""
+Token-bucket rate limiter shared across threads and worker processes
+Each budget (e.g. 5 per minute, 25 per day) is a bucket that refills
+continuously; a request needs a token from every bucket. Bucket state lives in
+a small JSON file updated under an exclusive file lock, so all Gunicorn
+workers draw from the same budget.
+
+Callers pick how to wait:
+    try_acquire()              fail fast: (granted, seconds until a token)
+    acquire(timeout)           block the calling thread up to timeout (background work)
+    await acquire_async(timeout)   wait on an event loop; with timeout=None this is a
+                                   queued reservation (see AlphaVantageService.submit)
+"""
+import asyncio
+import json
+import os
+import time
+
+from services.file_lock import file_lock
+
+DEFAULT_CACHE_PATH = os.getenv(
+    'CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache'),
+)
+
+
+class RateLimited(Exception):
+    """No token available within the caller's deadline"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limit reached; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    def __init__(self, name, budgets, root=None):
+        """budgets: [(tokens, per_seconds), ...], e.g. [(5, 60), (25, 86400)]"""
+        self.name = name
+        self.budgets = [(int(tokens), float(seconds)) for tokens, seconds in budgets]
+        root = root or DEFAULT_CACHE_PATH
+        self.path = os.path.join(root, f"{name}.ratelimit.json")
+        self.lock_path = self.path + '.lock'
+
+    def _load(self, now):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+            if len(state) == len(self.budgets):
+                return state
+        except (OSError, ValueError):
+            pass
+        # Missing or unreadable: start with full buckets
+        return [[tokens, now] for tokens, _ in self.budgets]
+
+    def _save(self, state):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def try_acquire(self, tokens=1):
+        """Take `tokens` from every bucket if all have them; returns (granted, retry_after)"""
+        with file_lock(self.lock_path):
+            now = time.time()
+            state = self._load(now)
+
+            levels = []
+            retry_after = 0.0
+            for (capacity, seconds), (level, updated) in zip(self.budgets, state):
+                rate = capacity / seconds
+                level = min(capacity, level + max(now - updated, 0) * rate)
+                levels.append(level)
+                if level < tokens:
+                    retry_after = max(retry_after, (tokens - level) / rate)
+
+            granted = retry_after == 0
+            if granted:
+                levels = [level - tokens for level in levels]
+            self._save([[level, now] for level in levels])
+            return granted, retry_after
+
+    def acquire(self, timeout=0):
+        """Block the calling thread until a token is granted or `timeout` seconds pass"""
+        deadline = time.time() + timeout
+        while True:
+            granted, retry_after = self.try_acquire()
+            if granted:
+                return
+            if time.time() + retry_after > deadline:
+                raise RateLimited(retry_after)
+            time.sleep(retry_after)
+
+    async def acquire_async(self, timeout=None):
+        """Wait on the event loop until a token is granted (timeout=None waits as long as needed)"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            # The flock and JSON read/write happen on a worker thread, not the loop
+            granted, retry_after = await asyncio.to_thread(self.try_acquire)
+            if granted:
+                return
+            if deadline is not None and time.time() + retry_after > deadline:
+                raise RateLimited(retry_after)
+            await asyncio.sleep(retry_after)
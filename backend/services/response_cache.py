@@ -0,0 +1,149 @@
+"""
+Serialize-once response cache
+GET responses are stored as encoded bytes (plus a gzip copy) keyed by route,
+normalized args, Accept header and the market epoch (or just the universe
+version for routes that don't depend on prices). Identical requests within an
+epoch reuse the bytes; a strong ETag lets clients revalidate with
+If-None-Match and get a 304 without the route running at all.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, make_response, request
+
+from services.market_ticker import market_ticker
+
+CACHE_ENTRIES = 1024
+CACHE_BYTES = 64 * 1024 * 1024
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_BYTES = 1024
+
+# Response headers carried over from the original response
+KEPT_HEADERS = ('Content-Type', 'X-Total-Count', 'X-Next-Cursor', 'X-Screener-Plan')
+
+
+class CachedResponse:
+    def __init__(self, body, headers, snapshot=None):
+        self.body = body
+        self.headers = headers
+        # (universe version, epoch) the body was built from
+        self.snapshot = snapshot
+        self.etag = hashlib.sha1(body).hexdigest()[:24]
+        self.gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        self.size = len(body) + len(self.gzipped or b'')
+
+    def respond(self):
+        """Response for the current request: 304, gzip or identity"""
+        if self.snapshot is not None:
+            g.market_snapshot = self.snapshot
+        if request.if_none_match.contains(self.etag):
+            response = Response(status=304)
+            response.set_etag(self.etag)
+            return response
+
+        if self.gzipped is not None and 'gzip' in request.accept_encodings:
+            response = Response(self.gzipped, status=200, headers=self.headers)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(self.body, status=200, headers=self.headers)
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.update(('Accept', 'Accept-Encoding'))
+        return response
+
+
+class ResponseCache:
+    def __init__(self, max_entries=CACHE_ENTRIES, max_bytes=CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # One build per key at a time; concurrent misses wait for it
+        self._building = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def build_lock(self, key):
+        with self._lock:
+            lock = self._building.get(key)
+            if lock is None:
+                lock = self._building[key] = threading.Lock()
+            return lock
+
+    def release_build_lock(self, key, lock):
+        with self._lock:
+            if self._building.get(key) is lock:
+                del self._building[key]
+
+
+response_cache = ResponseCache()
+
+
+def _request_key(view_args, per):
+    """Cache key for the current request, pinned to the current epoch or universe version"""
+    snap = market_ticker.snapshot()
+    args = tuple(sorted((name, tuple(values)) for name, values in request.args.lists()))
+    pinned = snap.universe.version if per == 'universe' else (snap.universe.version, snap.epoch)
+    return (request.endpoint, tuple(sorted(view_args.items())), args,
+            request.headers.get('Accept', ''), pinned)
+
+
+def cached_response(per='epoch'):
+    """
+    Cache a GET route's encoded 200 responses per market epoch (per='epoch')
+    or per universe version (per='universe'). Streamed and error responses
+    pass through uncached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            key = _request_key(kwargs, per)
+            entry = response_cache.get(key)
+            if entry is None:
+                lock = response_cache.build_lock(key)
+                try:
+                    with lock:
+                        entry = response_cache.get(key)
+                        if entry is None:
+                            response = make_response(view(*args, **kwargs))
+                            if response.status_code != 200 or response.is_streamed:
+                                return response
+                            headers = [(name, value) for name, value in response.headers
+                                       if name in KEPT_HEADERS]
+                            entry = CachedResponse(response.get_data(), headers, g.get('market_snapshot'))
+                            response_cache.put(key, entry)
+                finally:
+                    response_cache.release_build_lock(key, lock)
+            return entry.respond()
+        return wrapper
+    return decorator
+
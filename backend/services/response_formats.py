@@ -0,0 +1,88 @@
+"""
+Binary response formats negotiated by the Accept header
+    application/json                       default
+    application/msgpack                    same payload as JSON, MessagePack-encoded
+    application/vnd.apache.arrow.stream    Arrow IPC stream built straight from column arrays
+?format=json|msgpack|arrow overrides the Accept header. msgpack and pyarrow are
+optional; asking for a format whose package is missing gets a 406.
+"""
+import json
+
+import numpy as np
+from flask import Response, jsonify
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+FORMATS = {
+    JSON_MIMETYPE: 'json',
+    MSGPACK_MIMETYPE: 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    ARROW_MIMETYPE: 'arrow',
+}
+
+
+class UnsupportedFormat(Exception):
+    """The requested response format can't be produced here"""
+
+
+def response_format(request):
+    """'json', 'msgpack' or 'arrow' for this request (UnsupportedFormat if unavailable)"""
+    fmt = request.args.get('format')
+    if fmt is None:
+        mimetype = request.accept_mimetypes.best_match(list(FORMATS), default=JSON_MIMETYPE)
+        fmt = FORMATS[mimetype]
+
+    if fmt == 'msgpack' and msgpack is None:
+        raise UnsupportedFormat("MessagePack responses need the msgpack package")
+    if fmt == 'arrow' and pa is None:
+        raise UnsupportedFormat("Arrow responses need the pyarrow package")
+    if fmt not in ('json', 'msgpack', 'arrow'):
+        raise UnsupportedFormat(f"Unknown format: {fmt}")
+    return fmt
+
+
+def encode_response(fmt, payload, status=200):
+    """JSON or MessagePack response for a dict payload"""
+    if fmt == 'msgpack':
+        return Response(msgpack.packb(payload, use_bin_type=True), status=status, mimetype=MSGPACK_MIMETYPE)
+    return jsonify(payload), status
+
+
+def _arrow_array(values):
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+        # NaN -> null; the float buffer itself is handed over as-is
+        missing = np.isnan(values)
+        return pa.array(values, mask=missing if missing.any() else None)
+    return pa.array(values)
+
+
+def _metadata_value(value):
+    return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+
+def arrow_response(columns, metadata=None, headers=None):
+    """
+    Arrow IPC stream response from a dict of column arrays (no per-row objects);
+    metadata (e.g. page info) goes in the schema metadata
+    """
+    table = pa.Table.from_arrays(
+        [_arrow_array(values) for values in columns.values()],
+        names=list(columns),
+        metadata={key: _metadata_value(value) for key, value in (metadata or {}).items() if value is not None},
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), status=200, mimetype=ARROW_MIMETYPE, headers=headers)
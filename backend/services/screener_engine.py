@@ -0,0 +1,251 @@
+"""
+Screener query engine
+Compiles a filter spec into a vectorized predicate over a market snapshot
+(universe fundamentals + live prices). Compiled plans are cached by the hash
+of the normalized spec. Predicates work on packed row bitmaps: indexed
+fundamentals and sectors come from the universe's bitmap index, everything
+else is a packed mask, and and/or nodes are bitwise AND/OR.
+
+Accepted specs (all top-level conditions are ANDed):
+    {"minPE": 10, "maxPE": 25, "sector": "Banking"}      legacy screener keys
+    {"peMin": 10, "roeMin": 15, "debtRatioMax": 0.5}      AI search keys
+    {"field": "pe", "min": 10, "max": 25}
+    {"field": "pe", "between": [10, 25]}
+    {"field": "sector", "in": ["IT", "Banking"]}
+    {"and": [...]} / {"or": [...]}
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# API field name -> (source, attribute)
+#   'universe': column in StockUniverse.columns
+#   'market':   array attribute on MarketSnapshot
+NUMERIC_FIELDS = {
+    'price': ('market', 'price'),
+    'change': ('market', 'change'),
+    'changePercent': ('market', 'change_percent'),
+    'volume': ('market', 'volume'),
+    'week52High': ('market', 'week52_high'),
+    'week52Low': ('market', 'week52_low'),
+    'debtRatio': ('market', 'debt_ratio'),
+    'pe': ('universe', 'pe_ratio'),
+    'peRatio': ('universe', 'pe_ratio'),
+    'marketCap': ('universe', 'market_cap'),
+    'dividendYield': ('universe', 'dividend_yield'),
+    'roce': ('universe', 'roce'),
+    'roe': ('universe', 'roce'),
+    'quarterlyProfit': ('universe', 'quarterly_profit'),
+    'profitGrowth': ('universe', 'profit_growth'),
+    'quarterlySales': ('universe', 'quarterly_sales'),
+    'salesGrowth': ('universe', 'sales_growth'),
+}
+
+# Stocks without a P/E (missing or zero) are never excluded by P/E bounds
+MISSING_PASSES = {'pe_ratio'}
+
+# Flat-key spellings that don't follow the <field>Min / min<Field> pattern
+FLAT_ALIASES = {
+    'minPE': ('pe', 'min'),
+    'maxPE': ('pe', 'max'),
+    'minROCE': ('roce', 'min'),
+    'maxROCE': ('roce', 'max'),
+    'minROE': ('roe', 'min'),
+    'maxROE': ('roe', 'max'),
+}
+
+PLAN_CACHE_SIZE = 256
+
+
+def _flat_key(key):
+    """'peMin' / 'minPE' / 'minMarketCap' -> (field, 'min'|'max'), or None"""
+    if key in FLAT_ALIASES:
+        return FLAT_ALIASES[key]
+    for bound in ('min', 'max'):
+        if key.endswith(bound.capitalize()) and key[:-3] in NUMERIC_FIELDS:
+            return key[:-3], bound
+        if key.startswith(bound) and len(key) > 3:
+            field = key[3].lower() + key[4:]
+            if field in NUMERIC_FIELDS:
+                return field, bound
+    return None
+
+
+def _number(value, what):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid number for {what}: {value!r}")
+
+
+def _range(field, lo=None, hi=None):
+    if field not in NUMERIC_FIELDS:
+        raise ValueError(f"Unknown filter field: {field}")
+    source, column = NUMERIC_FIELDS[field]
+    return ['range', source, column,
+            None if lo is None else _number(lo, field),
+            None if hi is None else _number(hi, field)]
+
+
+def _sectors(values):
+    if isinstance(values, str):
+        values = [values]
+    return ['sector', sorted({str(value).strip().lower() for value in values})]
+
+
+def _sorted(nodes):
+    """Order-independent child order, so equivalent specs share a plan"""
+    return sorted(nodes, key=lambda node: json.dumps(node, separators=(',', ':')))
+
+
+def _node(spec, ignored):
+    """Normalize one condition (dict) into the canonical list form"""
+    if not isinstance(spec, dict):
+        raise ValueError(f"Filter conditions must be objects, got {spec!r}")
+
+    if 'field' in spec:
+        field = spec['field']
+        if field == 'sector':
+            if 'in' in spec:
+                return _sectors(spec['in'])
+            if 'eq' in spec:
+                return _sectors(spec['eq'])
+            raise ValueError("sector filters need 'in' or 'eq'")
+        if 'between' in spec:
+            bounds = spec['between']
+            if not isinstance(bounds, (list, tuple)) or len(bounds) != 2:
+                raise ValueError(f"'between' for {field} needs [min, max]")
+            return _range(field, *bounds)
+        if 'eq' in spec:
+            return _range(field, spec['eq'], spec['eq'])
+        return _range(field, spec.get('min'), spec.get('max'))
+
+    children = []
+    for key, value in spec.items():
+        if value is None:
+            continue
+        if key in ('and', 'or'):
+            if not isinstance(value, list):
+                raise ValueError(f"'{key}' needs a list of conditions")
+            children.append([key, _sorted([_node(child, ignored) for child in value])])
+        elif key == 'sector':
+            children.append(_sectors(value))
+        else:
+            parsed = _flat_key(key)
+            if parsed is None:
+                ignored.append(key)
+                continue
+            field, bound = parsed
+            children.append(_range(field, value if bound == 'min' else None, value if bound == 'max' else None))
+
+    return children[0] if len(children) == 1 else ['and', _sorted(children)]
+
+
+def normalize(spec):
+    """Canonical form of a filter spec plus the top-level keys that were ignored"""
+    ignored = []
+    node = _node(spec or {}, ignored)
+    return node, ignored
+
+
+def _compile(node):
+    """Canonical node -> function(snapshot) -> packed row bitmap (np.packbits)"""
+    kind = node[0]
+
+    if kind in ('and', 'or'):
+        parts = [_compile(child) for child in node[1]]
+        combine = np.bitwise_and if kind == 'and' else np.bitwise_or
+
+        def run(snap):
+            if not parts:
+                return np.packbits(np.full(len(snap), kind == 'and'))
+            bitmap = parts[0](snap)
+            for part in parts[1:]:
+                bitmap = combine(bitmap, part(snap))
+            return bitmap
+        return run
+
+    if kind == 'sector':
+        names = node[1]
+
+        def run(snap):
+            universe = snap.universe
+            bitmap = np.packbits(np.zeros(len(snap), dtype=bool))
+            for name in names:
+                code = universe.sector_index.resolve(name)
+                if code is not None:
+                    bitmap |= universe.bitmap_index.sector(code)
+            return bitmap
+        return run
+
+    _, source, column, lo, hi = node
+    missing_passes = column in MISSING_PASSES
+
+    def run(snap):
+        if source == 'universe' and column in snap.universe.bitmap_index:
+            return snap.universe.bitmap_index.range(column, lo, hi, missing_passes)
+
+        values = snap.universe.columns[column] if source == 'universe' else getattr(snap, column)
+        mask = np.ones(len(values), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            if lo is not None:
+                mask &= values >= lo
+            if hi is not None:
+                mask &= values <= hi
+        if missing_passes:
+            mask |= np.nan_to_num(values) == 0
+        return np.packbits(mask)
+    return run
+
+
+class ScreenerEngine:
+    def __init__(self, cache_size=PLAN_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def plan(self, spec):
+        """Compiled plan for a spec: (plan hash, predicate, ignored keys, cache hit)"""
+        node, ignored = normalize(spec)
+        key = hashlib.sha1(json.dumps(node, separators=(',', ':')).encode()).hexdigest()[:16]
+
+        with self._lock:
+            predicate = self._plans.get(key)
+            if predicate is not None:
+                self._plans.move_to_end(key)
+                return key, predicate, ignored, True
+
+        predicate = _compile(node)
+        with self._lock:
+            self._plans[key] = predicate
+            while len(self._plans) > self.cache_size:
+                self._plans.popitem(last=False)
+        return key, predicate, ignored, False
+
+    def run(self, spec, snap):
+        """Matching row IDs for a spec against a snapshot, plus execution stats"""
+        started = time.perf_counter()
+        key, predicate, ignored, cached = self.plan(spec)
+        rows = np.flatnonzero(np.unpackbits(predicate(snap), count=len(snap)))
+        elapsed = time.perf_counter() - started
+
+        total = len(snap)
+        stats = {
+            'plan': key,
+            'planCached': cached,
+            'matched': len(rows),
+            'total': total,
+            'selectivity': round(len(rows) / total, 4) if total else 0,
+            'elapsedMs': round(elapsed * 1000, 3),
+        }
+        if ignored:
+            stats['ignored'] = ignored
+        return rows, stats
+
+
+# Global instance
+screener_engine = ScreenerEngine()
@@ -0,0 +1,39 @@
+"""
+Streaming NDJSON responses
+One JSON document per line, serialized and sent a chunk at a time as rows are
+produced, so large exports never hold the whole payload in memory.
+Requested with ?stream=ndjson or Accept: application/x-ndjson.
+"""
+import json
+
+from flask import Response
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson(request):
+    """Whether the client asked for a streamed NDJSON response"""
+    if request.args.get('stream') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def _encode(chunks):
+    for rows in chunks:
+        if rows:
+            yield ''.join(json.dumps(row, separators=(',', ':')) + '\n' for row in rows)
+
+
+def ndjson_response(chunks, headers=None):
+    """Streamed response from an iterable of row lists"""
+    return Response(_encode(chunks), status=200, mimetype=NDJSON_MIMETYPE, headers=headers)
+
+
+def page_headers(page):
+    """Page info (see ListQuery.page) as response headers, since NDJSON lines are rows only"""
+    headers = {'X-Total-Count': str(page['total'])}
+    if page.get('nextCursor'):
+        headers['X-Next-Cursor'] = page['nextCursor']
+    if page.get('stats'):
+        headers['X-Screener-Plan'] = page['stats']['plan']
+    return headers
@@ -0,0 +1,232 @@
+"""
+Append-only OHLCV time-series store
+One directory per symbol holding fixed-width binary columns (date, open, high,
+low, close, volume). Reads are memory-mapped and range/last-N queries return
+zero-copy slices of the mapped columns.
+
+Appends extend the column files in place. A backfill writes a new generation
+directory and flips the symbol's HEAD file, so readers never see a half-
+rewritten series.
+"""
+import os
+import re
+import shutil
+import threading
+
+import numpy as np
+
+from services.file_lock import file_lock
+
+DEFAULT_TIMESERIES_PATH = os.getenv(
+    'TIMESERIES_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'timeseries'),
+)
+
+# Column name -> on-disk dtype; 'date' is written last and defines the committed length
+COLUMNS = {
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<i8'),
+    'date': np.dtype('<M8[D]'),
+}
+
+
+def empty_bars():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+class TimeSeriesStore:
+    def __init__(self, root=None):
+        self.root = root or DEFAULT_TIMESERIES_PATH
+        self._maps = {}
+        self._maps_lock = threading.Lock()
+
+    def _dir(self, symbol):
+        return os.path.join(self.root, re.sub(r'[^A-Z0-9._-]', '_', str(symbol).upper()))
+
+    def _generation(self, symbol):
+        try:
+            with open(os.path.join(self._dir(symbol), 'HEAD')) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _set_generation(self, symbol, generation):
+        head = os.path.join(self._dir(symbol), 'HEAD')
+        with open(head + '.tmp', 'w') as f:
+            f.write(str(generation))
+        os.replace(head + '.tmp', head)
+
+    def _path(self, symbol, column, generation=None):
+        if generation is None:
+            generation = self._generation(symbol)
+        return os.path.join(self._dir(symbol), f'g{generation}', f'{column}.bin')
+
+    def _lock(self, symbol):
+        return file_lock(os.path.join(self._dir(symbol), '.lock'))
+
+    def _columns(self, symbol):
+        """Memory-mapped columns for a symbol, re-mapped when the files change"""
+        # Retry if a concurrent backfill removes the generation we just read
+        for _ in range(3):
+            try:
+                return self._map(symbol)
+            except FileNotFoundError:
+                continue
+        return empty_bars()
+
+    def _map(self, symbol):
+        generation = self._generation(symbol)
+        if not os.path.exists(os.path.join(self._dir(symbol), f'g{generation}')):
+            return empty_bars()
+
+        stat = os.stat(self._path(symbol, 'date', generation))
+        key = self._dir(symbol)
+        stamp = (generation, stat.st_size)
+        cached = self._maps.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        length = stat.st_size // COLUMNS['date'].itemsize
+        if length == 0:
+            return empty_bars()
+
+        columns = {
+            name: np.memmap(self._path(symbol, name, generation), dtype=dtype, mode='r', shape=(length,))
+            for name, dtype in COLUMNS.items()
+        }
+        with self._maps_lock:
+            self._maps[key] = (stamp, columns)
+        return columns
+
+    def length(self, symbol):
+        return len(self._columns(symbol)['date'])
+
+    def first_date(self, symbol):
+        dates = self._columns(symbol)['date']
+        return dates[0] if len(dates) else None
+
+    def last_date(self, symbol):
+        dates = self._columns(symbol)['date']
+        return dates[-1] if len(dates) else None
+
+    def range(self, symbol, start=None, end=None):
+        """Bars with start <= date <= end (either bound optional), as zero-copy slices"""
+        columns = self._columns(symbol)
+        dates = columns['date']
+        lo = 0 if start is None else np.searchsorted(dates, np.datetime64(start, 'D'), side='left')
+        hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end, 'D'), side='right')
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    def last(self, symbol, n):
+        """The most recent n bars, as zero-copy slices"""
+        columns = self._columns(symbol)
+        start = max(len(columns['date']) - max(int(n), 0), 0)
+        return {name: values[start:] for name, values in columns.items()}
+
+    @staticmethod
+    def _sorted_rows(dates):
+        """Row order that sorts dates, keeping the last occurrence of a duplicate date"""
+        order = np.argsort(dates, kind='stable')
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = dates[order][:-1] != dates[order][1:]
+        return order[keep]
+
+    def append(self, symbol, bars):
+        """Append bars newer than the last stored date; returns how many were written"""
+        with self._lock(symbol):
+            return self._append(symbol, bars)
+
+    def _append(self, symbol, bars):
+        last = self.last_date(symbol)
+        dates = np.asarray(bars['date'], dtype=COLUMNS['date'])
+        rows = self._sorted_rows(dates)
+        if last is not None:
+            rows = rows[dates[rows] > last]
+        if not len(rows):
+            return 0
+
+        generation = self._generation(symbol)
+        os.makedirs(os.path.dirname(self._path(symbol, 'date', generation)), exist_ok=True)
+        # Cut off bytes an interrupted append left past the committed length, so
+        # the new bars line up across columns
+        try:
+            committed = os.path.getsize(self._path(symbol, 'date', generation)) // COLUMNS['date'].itemsize
+        except FileNotFoundError:
+            committed = 0
+        for name, dtype in COLUMNS.items():
+            values = np.asarray(bars[name])[rows].astype(dtype)
+            with open(self._path(symbol, name, generation), 'ab') as f:
+                f.truncate(committed * dtype.itemsize)
+                f.write(values.tobytes())
+        return len(rows)
+
+    def replace(self, symbol, bars):
+        """Rewrite a symbol's whole series (used for backfilling older history)"""
+        with self._lock(symbol):
+            return self._rewrite(symbol, bars)
+
+    def _rewrite(self, symbol, bars):
+        dates = np.asarray(bars['date'], dtype=COLUMNS['date'])
+        rows = self._sorted_rows(dates)
+
+        previous = self._generation(symbol)
+        generation = previous + 1
+        target = os.path.dirname(self._path(symbol, 'date', generation))
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(target)
+        for name, dtype in COLUMNS.items():
+            with open(self._path(symbol, name, generation), 'wb') as f:
+                f.write(np.asarray(bars[name])[rows].astype(dtype).tobytes())
+
+        self._set_generation(symbol, generation)
+        # Open mappings keep the old files alive until they are dropped
+        shutil.rmtree(os.path.dirname(self._path(symbol, 'date', previous)), ignore_errors=True)
+        return len(rows)
+
+    def merge(self, symbol, bars):
+        """
+        Add fetched bars to a symbol's series; returns how many bars were added
+        or revised. Fetched bars win over stored ones for the same date (the
+        latest daily bar is partial until the session closes). Revised bars are
+        patched in place and newer ones appended, so a compact fetch never
+        rewrites history; bars before the stored range, or filling a gap
+        inside it, rewrite the series once as a new generation.
+        """
+        with self._lock(symbol):
+            stored = self._columns(symbol)
+            dates = np.asarray(bars['date'], dtype=COLUMNS['date'])
+            stored_dates = stored['date']
+            if len(stored_dates) == 0 or len(dates) == 0:
+                return self._append(symbol, bars)
+
+            rows = self._sorted_rows(dates)
+            fetched = {name: np.asarray(bars[name])[rows].astype(dtype) for name, dtype in COLUMNS.items()}
+            inside = fetched['date'] <= stored_dates[-1]
+            overlap = {name: values[inside] for name, values in fetched.items()}
+            positions = np.searchsorted(stored_dates, overlap['date'])
+            known = stored_dates[positions] == overlap['date']
+            positions, overlap = positions[known], {name: values[known] for name, values in overlap.items()}
+
+            revised = np.zeros(len(positions), dtype=bool)
+            for name in COLUMNS:
+                revised |= stored[name][positions] != overlap[name]
+
+            if not known.all():
+                # Older history or gaps: one rewrite, fetched values last so they win duplicates
+                before = len(stored_dates)
+                merged = {name: np.concatenate([stored[name], fetched[name]]) for name in COLUMNS}
+                return self._rewrite(symbol, merged) - before + int(revised.sum())
+
+            if revised.any():
+                generation = self._generation(symbol)
+                for name, dtype in COLUMNS.items():
+                    with open(self._path(symbol, name, generation), 'r+b') as f:
+                        for position, value in zip(positions[revised].tolist(), overlap[name][revised]):
+                            f.seek(position * dtype.itemsize)
+                            f.write(value.tobytes())
+
+            newer = {name: values[~inside] for name, values in fetched.items()}
+            return int(revised.sum()) + self._append(symbol, newer)
@@ -0,0 +1,71 @@
+"""
+Persistent TTL cache backed by SQLite
+JSON values keyed by (namespace, key) with the time they were stored, so
+callers can tell fresh from stale and serve stale data while refreshing.
+WAL mode lets several worker processes read and write the same file, and the
+cache survives restarts.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class PersistentTTLCache:
+    def __init__(self, path):
+        self.path = path
+        # sqlite3 connections can't be shared between threads
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace, key):
+        """(value, age in seconds) or None if never stored"""
+        try:
+            row = self._connection().execute(
+                'SELECT value, stored_at FROM entries WHERE namespace = ? AND key = ?',
+                (namespace, key),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading cache {namespace}/{key}: {str(e)}")
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), max(time.time() - row[1], 0)
+
+    def set(self, namespace, key, value):
+        try:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO entries (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value, separators=(',', ':')), time.time()),
+            )
+        except sqlite3.Error as e:
+            print(f"Error writing cache {namespace}/{key}: {str(e)}")
+
+    def purge(self, namespace, older_than):
+        """Drop entries in a namespace older than `older_than` seconds"""
+        self._connection().execute(
+            'DELETE FROM entries WHERE namespace = ? AND stored_at < ?',
+            (namespace, time.time() - older_than),
+        )
+
@@ -0,0 +1,75 @@
+"""
+Versioned, hot-reloadable universe snapshots
+Holds the current immutable StockUniverse and swaps in a rebuilt one when the
+universe source (bundle meta.json or the seed module) changes on disk.
+Readers grab one snapshot reference per operation, so in-flight requests
+finish on the old version while new requests see the new one.
+"""
+import os
+import threading
+
+from data.universe_store import DEFAULT_UNIVERSE_PATH, load_universe, source_stamp
+
+
+class UniverseManager:
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_UNIVERSE_PATH
+        self._reload_lock = threading.Lock()
+        self._stamp = source_stamp(self.path)
+        self._current = load_universe(self.path).build_indexes()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def current(self):
+        """The current universe snapshot (never mutated once published)"""
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def reload(self, force=False):
+        """Rebuild the snapshot if the source changed; returns True if swapped"""
+        with self._reload_lock:
+            stamp = source_stamp(self.path)
+            if stamp == self._stamp and not force:
+                return False
+
+            try:
+                # A broken bundle keeps the current snapshot rather than swapping in the seed
+                universe = load_universe(self.path, reload=True, fallback=False).build_indexes()
+            except Exception as e:
+                print(f"Error reloading universe: {str(e)}")
+                return False
+
+            self._stamp = stamp
+            if universe.version == self._current.version:
+                return False
+
+            # Single reference assignment: readers see either the old or the new snapshot
+            previous = self._current
+            self._current = universe
+            print(f"Universe reloaded: {previous.version} -> {universe.version} ({len(universe)} stocks)")
+            return True
+
+    def start_watching(self, interval=None):
+        """Poll the universe source in a background thread and hot-swap on change"""
+        if interval is None:
+            interval = float(os.getenv('UNIVERSE_WATCH_INTERVAL', 10))
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload()
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=watch, name='universe-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+
+# Global instance
+universe_manager = UniverseManager()
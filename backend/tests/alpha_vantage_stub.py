@@ -0,0 +1,105 @@
+"""
+Local stand-in for the Alpha Vantage API
+Replays the payloads in fixtures/alphavantage (FUNCTION_SYMBOL[_outputsize].json)
+over keep-alive HTTP/1.1 and records every request and client connection.
+Symbols without a fixture get IBM's payload relabelled with their symbol.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'alphavantage')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, f'{name}.json')) as f:
+        return json.load(f)
+
+
+def _relabel(payload, symbol):
+    payload = copy.deepcopy(payload)
+    if 'Global Quote' in payload:
+        payload['Global Quote']['01. symbol'] = symbol
+    if 'Symbol' in payload:
+        payload['Symbol'] = symbol
+    if 'Meta Data' in payload:
+        payload['Meta Data']['2. Symbol'] = symbol
+    return payload
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops bursts of concurrent connects, and the
+    # client's SYN retry then adds a second to the burst
+    request_queue_size = 128
+
+
+class AlphaVantageStub:
+    def __init__(self, delay=0.0):
+        # Seconds each response is held back (to observe concurrency)
+        self.delay = delay
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # (function, symbol, outputsize or None) -> payload served instead of the fixture
+        self.overrides = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                with stub._lock:
+                    stub.requests.append(params)
+                    stub.connections.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    body = json.dumps(stub.payload(params)).encode()
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = _Server(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/query"
+
+    def payload(self, params):
+        function, symbol, outputsize = params['function'], params.get('symbol', ''), params.get('outputsize')
+        if (function, symbol, outputsize) in self.overrides:
+            return self.overrides[(function, symbol, outputsize)]
+        name = f"{function}_IBM" + (f"_{outputsize}" if outputsize else '')
+        if not os.path.exists(os.path.join(FIXTURES, f'{name}.json')):
+            return {}
+        return _relabel(load_fixture(name), symbol)
+
+    def count(self, function=None):
+        """Requests served so far (optionally for one function)"""
+        return sum(1 for params in self.requests if function is None or params['function'] == function)
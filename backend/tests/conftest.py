@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep caches, rate-limit state and stored bars out of the working tree
+_scratch = tempfile.mkdtemp(prefix='arthadrishti-tests-')
+os.environ.setdefault('CACHE_PATH', os.path.join(_scratch, 'cache'))
+os.environ.setdefault('TIMESERIES_PATH', os.path.join(_scratch, 'timeseries'))
+
+from alpha_vantage_stub import AlphaVantageStub  # noqa: E402
+from services.alpha_vantage_service import AlphaVantageService  # noqa: E402
+from services.rate_limiter import TokenBucketLimiter  # noqa: E402
+from services.timeseries_store import TimeSeriesStore  # noqa: E402
+from services.ttl_cache import PersistentTTLCache  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    server = AlphaVantageStub().start()
+    yield server
+    server.stop()
+
+
+def make_service(stub, root, budgets=((1000, 60),)):
+    """AlphaVantageService pointed at the stub, with its own limiter, cache and store under root"""
+    service = AlphaVantageService()
+    service.BASE_URL = stub.url
+    service.limiter = TokenBucketLimiter('test', list(budgets), root=str(root))
+    service.cache = PersistentTTLCache(os.path.join(str(root), 'alphavantage.sqlite3'))
+    service.history = TimeSeriesStore(os.path.join(str(root), 'timeseries'))
+    return service
+
+
+@pytest.fixture
+def service(stub, tmp_path):
+    service = make_service(stub, tmp_path)
+    yield service
+    service.close()
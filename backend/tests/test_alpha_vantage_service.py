@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from alpha_vantage_stub import load_fixture
+
+
+def test_sync_facade_parses_replayed_payloads(service):
+    assert service.get_quote('IBM') == {
+        'symbol': 'IBM',
+        'price': 248.66,
+        'change': 1.69,
+        'changePercent': 0.6843,
+        'volume': 3174872,
+        'previousClose': 246.97,
+    }
+
+    overview = service.get_company_overview('IBM')
+    assert overview['name'] == 'International Business Machines'
+    assert overview['marketCap'] == 229965955000
+    assert overview['debtToEquity'] == 0  # 'None' in the payload
+
+    bars = service.get_time_series_daily('IBM')
+    expected = load_fixture('TIME_SERIES_DAILY_IBM_compact')['Time Series (Daily)']
+    assert [bar['date'] for bar in bars] == sorted(expected)
+    assert bars[-1] == {'date': '2025-01-10', 'open': 247.51, 'high': 249.1, 'low': 245.65,
+                        'close': 248.66, 'volume': 3174872}
+
+
+def test_calls_reuse_one_pooled_connection(service, stub):
+    for symbol in ('IBM', 'MSFT', 'AAPL', 'TCS', 'INFY'):
+        assert service.get_quote(symbol)['symbol'] == symbol
+
+    assert stub.count() == 5
+    assert len(stub.connections) == 1
+
+
+def test_bulk_quotes_fan_out_concurrently(service, stub):
+    stub.delay = 0.2
+    symbols = [f'S{i}' for i in range(8)]
+
+    started = time.time()
+    quotes = service.get_bulk_quotes(symbols)
+    elapsed = time.time() - started
+
+    assert sorted(quotes) == symbols
+    assert stub.max_in_flight > 1
+    assert elapsed < len(symbols) * stub.delay / 2
+
+
+def test_sync_facade_is_safe_from_many_threads(service, stub):
+    symbols = [f'T{i}' for i in range(16)]
+    with ThreadPoolExecutor(8) as pool:
+        quotes = list(pool.map(service.get_quote, symbols))
+
+    assert [quote['symbol'] for quote in quotes] == symbols
+    assert stub.count() == len(symbols)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from services.indian_stock_generator import IndianStockGenerator
+from services.market_ticker import QUOTE_DELAY, MarketTicker
+
+SNAPSHOT_ARRAYS = ('price', 'change', 'volume', 'week52_high', 'week52_low', 'debt_ratio', 'live')
+
+
+def _same(a, b):
+    return a.epoch == b.epoch and all(np.array_equal(getattr(a, name), getattr(b, name)) for name in SNAPSHOT_ARRAYS)
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    """Two tickers standing in for two worker processes, on a frozen clock"""
+    tickers = [MarketTicker(quotes_path=str(tmp_path / 'market_quotes.json')) for _ in range(2)]
+    clock = {'epoch': max(ticker.epoch for ticker in tickers) + 10}
+    for ticker in tickers:
+        monkeypatch.setattr(ticker, '_current_epoch', lambda: clock['epoch'])
+    return tickers, clock
+
+
+def test_workers_compute_the_same_snapshot_for_an_epoch(workers):
+    (first, second), clock = workers
+    first.snapshot()
+    clock['epoch'] += 1
+    # One ticks every epoch, the other only after a gap
+    for _ in range(5):
+        first.snapshot()
+        clock['epoch'] += 1
+    assert _same(first.snapshot(), second.snapshot())
+    assert np.array_equal(first.snapshot().traded, second.snapshot().traded)
+
+    # Older epochs are rebuilt identically by a worker that never published them
+    assert _same(first.snapshot_at(clock['epoch'] - 3), second.snapshot_at(clock['epoch'] - 3))
+
+
+def test_prices_move_for_a_fraction_of_symbols_per_tick(workers):
+    (ticker, _), clock = workers
+    before = ticker.snapshot()
+    clock['epoch'] += 1
+    after = ticker.snapshot()
+
+    moved = np.mean(before.price != after.price)
+    assert 0.1 < moved < 0.5
+    assert np.all(np.abs(after.variation) <= 0.01)
+    assert np.all(after.volume >= before.volume)
+
+
+def test_snapshots_outside_the_window_or_universe_are_not_served(workers):
+    (ticker, _), clock = workers
+    snap = ticker.snapshot()
+    assert ticker.snapshot_at(snap.epoch - ticker.window) is None
+    assert ticker.snapshot_at(snap.epoch + 1) is None
+    assert ticker.snapshot_at(snap.epoch, version='other') is None
+    assert ticker.snapshot_at(snap.epoch, version=snap.universe.version) is snap
+
+
+def test_published_quotes_reach_every_worker_on_the_same_epoch(workers):
+    (publisher, reader), clock = workers
+    symbol = publisher.snapshot().universe.symbols[0]
+    assert publisher.apply_quotes({symbol: {'price': 123.0, 'previousClose': 120.0, 'volume': 42}}) == 1
+    effective = clock['epoch'] + QUOTE_DELAY
+
+    clock['epoch'] = effective - 1
+    assert not reader.snapshot().live[0]
+    clock['epoch'] = effective
+    for snap in (reader.snapshot(), publisher.snapshot()):
+        assert snap.live[0]
+        assert snap.price[0] == pytest.approx(123.0)
+        assert snap.change[0] == pytest.approx(3.0)
+        assert snap.volume[0] == 42
+    assert _same(reader.snapshot(), publisher.snapshot())
+
+    # Republishing the same quote (e.g. from another worker) keeps its epoch
+    clock['epoch'] += 5
+    reader.apply_quotes({symbol: {'price': 123.0, 'previousClose': 120.0, 'volume': 42}})
+    assert reader.snapshot_at(effective).live[0]
+
+
+def test_change_feed_accepts_an_epoch_from_another_worker(workers):
+    (first, second), clock = workers
+    since = first.snapshot().epoch
+    clock['epoch'] += 3
+
+    stocks, epoch, full = IndianStockGenerator(ticker=second).get_changes(since)
+    expected = first.snapshot()
+    changed = np.flatnonzero(np.round(first.snapshot_at(since).price, 2) != np.round(expected.price, 2))
+
+    assert not full
+    assert epoch == expected.epoch
+    assert {stock['symbol'] for stock in stocks} >= {expected.universe.symbols[row] for row in changed}
+    assert len(stocks) < len(expected)
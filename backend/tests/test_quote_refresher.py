@@ -0,0 +1,43 @@
+import time
+
+from services.quote_refresher import QUOTE_MAX_AGE, SYMBOL_SUFFIX, QuoteRefresher
+from services.universe_manager import universe_manager
+
+
+class RecordingTicker:
+    def __init__(self):
+        self.published = []
+
+    def apply_quotes(self, quotes):
+        self.published.append(quotes)
+        return len(quotes)
+
+
+def _refresher(service, symbol):
+    refresher = QuoteRefresher(service=service, ticker=RecordingTicker(), manager=universe_manager, client=None)
+    refresher.set_demand(holdings=[symbol])
+    return refresher
+
+
+def test_workers_share_one_fetch_per_quote(service, stub):
+    symbol = universe_manager.current().symbols[0]
+    workers = [_refresher(service, symbol) for _ in range(3)]
+    # Every worker has published this symbol before and its quote is now due
+    for worker in workers:
+        worker._quoted_at[symbol] = time.time() - QUOTE_MAX_AGE - 1
+
+    assert [worker.refresh_once() for worker in workers] == [symbol] * 3
+    assert stub.count('GLOBAL_QUOTE') == 1
+    for worker in workers:
+        assert worker.ticker.published[-1][symbol]['symbol'] == symbol + SYMBOL_SUFFIX
+        assert worker.priorities() == []
+
+
+def test_a_recent_quote_in_the_shared_cache_is_not_fetched_again(service, stub):
+    symbol = universe_manager.current().symbols[1]
+    service.cache.set('quote', symbol + SYMBOL_SUFFIX, {'symbol': symbol, 'price': 10.0})
+
+    worker = _refresher(service, symbol)
+    assert worker.refresh_once() == symbol
+    assert worker.ticker.published == [{symbol: {'symbol': symbol, 'price': 10.0}}]
+    assert stub.count() == 0
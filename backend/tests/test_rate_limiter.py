@@ -0,0 +1,89 @@
+import multiprocessing
+import time
+
+import pytest
+
+from conftest import make_service
+from services.rate_limiter import RateLimited, TokenBucketLimiter
+
+
+def _grab(root, attempts, granted):
+    limiter = TokenBucketLimiter('shared', [(10, 3600)], root=root)
+    granted.put(sum(limiter.try_acquire()[0] for _ in range(attempts)))
+
+
+def test_bucket_grants_its_budget_then_reports_retry_after(tmp_path):
+    limiter = TokenBucketLimiter('t', [(3, 60)], root=str(tmp_path))
+
+    assert [limiter.try_acquire()[0] for _ in range(3)] == [True, True, True]
+    granted, retry_after = limiter.try_acquire()
+    assert not granted
+    assert 0 < retry_after <= 20
+
+
+def test_every_budget_must_have_a_token(tmp_path):
+    limiter = TokenBucketLimiter('t', [(5, 60), (2, 86400)], root=str(tmp_path))
+
+    assert [limiter.try_acquire()[0] for _ in range(3)] == [True, True, False]
+
+
+def test_bucket_refills_continuously(tmp_path):
+    limiter = TokenBucketLimiter('t', [(2, 0.2)], root=str(tmp_path))
+    limiter.try_acquire()
+    limiter.try_acquire()
+
+    started = time.time()
+    limiter.acquire(timeout=1)
+    assert time.time() - started < 0.5
+
+
+def test_acquire_raises_when_the_deadline_cannot_be_met(tmp_path):
+    limiter = TokenBucketLimiter('t', [(1, 60)], root=str(tmp_path))
+    limiter.try_acquire()
+
+    started = time.time()
+    with pytest.raises(RateLimited) as error:
+        limiter.acquire(timeout=0.1)
+    assert time.time() - started < 0.1
+    assert error.value.retry_after > 0.1
+
+
+def test_budget_is_shared_across_processes(tmp_path):
+    context = multiprocessing.get_context('spawn')
+    granted = context.Queue()
+    workers = [context.Process(target=_grab, args=(str(tmp_path), 8, granted)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert sum(granted.get(timeout=5) for _ in workers) == 10
+
+
+def test_service_fails_fast_when_out_of_budget(stub, tmp_path):
+    service = make_service(stub, tmp_path, budgets=[(2, 60)])
+    try:
+        started = time.time()
+        quotes = service.get_bulk_quotes([f'S{i}' for i in range(5)])
+        assert time.time() - started < 1
+        assert len(quotes) == 2
+        assert stub.count() == 2
+
+        assert service.get_quote('LATE', wait=0.05) is None
+        assert stub.count() == 2
+    finally:
+        service.close()
+
+
+def test_queued_requests_wait_for_a_token_off_the_caller(stub, tmp_path):
+    service = make_service(stub, tmp_path, budgets=[(1, 0.3)])
+    try:
+        service.get_quote('FIRST')
+
+        started = time.time()
+        future = service.submit(service.get_quote_async('QUEUED'))
+        assert time.time() - started < 0.1
+        assert future.result(timeout=5)['symbol'] == 'QUEUED'
+        assert stub.count() == 2
+    finally:
+        service.close()
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import make_service
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.2)
+        return value * 2
+
+    with ThreadPoolExecutor(10) as pool:
+        results = list(pool.map(lambda _: flights.do('key', slow, 21), range(10)))
+
+    assert results == [42] * 10
+    assert len(calls) == 1
+    assert flights.coalesced == 9
+
+
+def test_errors_reach_every_waiter_and_are_not_kept():
+    flights = SingleFlight()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ValueError('boom')
+
+    with ThreadPoolExecutor(5) as pool:
+        futures = [pool.submit(flights.do, 'key', failing) for _ in range(5)]
+    assert all(isinstance(future.exception(), ValueError) for future in futures)
+    assert len(calls) == 1
+
+    # A later call runs again
+    with pytest.raises(ValueError):
+        flights.do('key', failing)
+    assert len(calls) == 2
+
+
+def test_async_waiters_share_one_task_and_survive_a_cancelled_waiter():
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    async def fetch():
+        calls.append(1)
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return 'value'
+
+    async def scenario():
+        waiters = [asyncio.ensure_future(flights.do_async('key', fetch)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        waiters[0].cancel()
+        release.set()
+        return await asyncio.gather(*waiters[1:])
+
+    assert asyncio.run(scenario()) == ['value'] * 3
+    assert len(calls) == 1
+
+
+def test_identical_api_fetches_are_coalesced(service, stub):
+    stub.delay = 0.2
+    with ThreadPoolExecutor(20) as pool:
+        series = list(pool.map(lambda _: service.get_time_series_daily('IBM', wait=5), range(20)))
+        overviews = list(pool.map(lambda _: service.get_company_overview('IBM', wait=5), range(20)))
+
+    assert all(result == series[0] for result in series) and series[0]
+    assert all(result == overviews[0] for result in overviews) and overviews[0]
+    assert stub.count('TIME_SERIES_DAILY') == 1
+    assert stub.count('OVERVIEW') == 1
+
+
+def test_fail_fast_and_queued_callers_do_not_share_a_fetch(stub, tmp_path):
+    service = make_service(stub, tmp_path, budgets=[(1, 1)])
+    try:
+        service.get_quote('FIRST')
+
+        # A fail-fast read must not wait behind a background refresh queued for a token
+        refresh = service.submit(service.refresh_quote_async('X'))
+        started = time.time()
+        assert service.get_quote('X', wait=0) is None
+        assert time.time() - started < 0.3
+        assert refresh.result(timeout=5)['symbol'] == 'X'
+
+        # ...and a queued refresh must not give up with a fail-fast read it arrived with
+        async def both():
+            return await asyncio.gather(service.get_quote_async('Y', 0), service.refresh_quote_async('Y'))
+
+        fail_fast, queued = service.submit(both()).result(timeout=5)
+        assert fail_fast is None
+        assert queued['symbol'] == 'Y'
+    finally:
+        service.close()
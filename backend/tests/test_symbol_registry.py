@@ -0,0 +1,33 @@
+import pytest
+
+from data.symbol_registry import SymbolRegistry
+
+
+def test_alias_cannot_take_over_another_symbol():
+    registry = SymbolRegistry.from_records([{'symbol': 'TCS'}, {'symbol': 'INFY'}])
+
+    with pytest.raises(ValueError):
+        registry.add_alias('tcs', 'INFY')
+    with pytest.raises(ValueError):
+        registry.add_alias('TCS.NS', 'INFY')
+    assert registry.resolve('TCS') == 'TCS'
+
+    # Re-pointing an alias at the listing it already names is fine
+    registry.add_alias('tcs.bse', 'TCS')
+    registry.add_alias('INE467B01029', 'TCS')
+    registry.add_alias('INE467B01029', 'TCS')
+    assert registry.resolve('ine467b01029') == 'TCS'
+
+
+def test_symbol_cannot_reuse_an_earlier_alias():
+    records = [
+        {'symbol': 'RELIANCE', 'isin': 'INE002A01018', 'nse_code': 'RIL'},
+        {'symbol': 'RIL'},
+    ]
+    with pytest.raises(ValueError, match='already an alias of'):
+        SymbolRegistry.from_records(records)
+
+
+def test_repeated_symbol_is_rejected():
+    with pytest.raises(ValueError, match='Duplicate symbol'):
+        SymbolRegistry.from_records([{'symbol': 'TCS'}, {'symbol': 'INFY'}, {'symbol': 'tcs'}])
@@ -0,0 +1,87 @@
+import numpy as np
+
+from alpha_vantage_stub import load_fixture
+from services.timeseries_store import TimeSeriesStore
+
+
+def _bars(dates, close, volume=100):
+    dates = np.array(dates, dtype='datetime64[D]')
+    close = np.broadcast_to(np.asarray(close, dtype=np.float64), dates.shape)
+    return {'date': dates, 'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+            'volume': np.full(len(dates), volume)}
+
+
+def _days(start, count):
+    return np.arange(np.datetime64(start), np.datetime64(start) + count)
+
+
+def test_compact_fetch_appends_and_revises_the_partial_last_bar_in_place(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    store.merge('X', _bars(_days('2025-01-01', 5), 10.0))
+
+    # Same window shifted by one day; the previously last (partial) bar was revised
+    update = _bars(_days('2025-01-02', 5), 10.0)
+    update['close'] = update['close'].copy()
+    update['close'][3] = 12.5
+    assert store.merge('X', update) == 2
+
+    bars = store.range('X')
+    assert len(bars['date']) == 6
+    assert bars['close'][4] == 12.5
+    assert str(bars['date'][-1]) == '2025-01-06'
+    assert store._generation('X') == 0  # no rewrite
+
+
+def test_older_history_rewrites_once_and_fetched_values_win(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    store.merge('X', _bars(_days('2025-01-10', 3), 10.0))
+
+    assert store.merge('X', _bars(_days('2025-01-01', 12), 20.0)) == 9 + 3
+    bars = store.range('X')
+    assert len(bars['date']) == 12
+    assert np.all(bars['close'] == 20.0)
+    assert store._generation('X') == 1
+
+
+def test_identical_refetch_changes_nothing(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    bars = _bars(_days('2025-01-01', 5), 10.0)
+    store.merge('X', bars)
+
+    assert store.merge('X', bars) == 0
+    assert store._generation('X') == 0
+
+
+def test_append_realigns_columns_after_an_interrupted_write(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    store.append('X', _bars(['2025-01-01'], 1.0))
+    # An append that died after writing part of the first columns
+    with open(store._path('X', 'open'), 'ab') as f:
+        f.write(np.array([9.0]).tobytes())
+    with open(store._path('X', 'high'), 'ab') as f:
+        f.write(np.array([9.0]).tobytes()[:3])
+
+    store.append('X', _bars(['2025-01-02'], 2.0))
+    bars = store.range('X')
+    assert bars['open'].tolist() == [1.0, 2.0]
+    assert bars['high'].tolist() == [2.0, 3.0]
+    assert bars['close'].tolist() == [1.0, 2.0]
+
+
+def test_service_merges_compact_and_full_fetches(service, stub):
+    compact = service.get_time_series_daily('IBM')
+    assert len(compact) == 5
+
+    full = service.get_time_series_daily('IBM', outputsize='full')
+    expected = load_fixture('TIME_SERIES_DAILY_IBM_full')['Time Series (Daily)']
+    assert [bar['date'] for bar in full] == sorted(expected)
+
+    # A later compact fetch revises the bar that was still in progress
+    revised = load_fixture('TIME_SERIES_DAILY_IBM_compact')
+    revised['Time Series (Daily)']['2025-01-10']['4. close'] = '250.1200'
+    stub.overrides[('TIME_SERIES_DAILY', 'IBM', 'compact')] = revised
+    service.cache.purge('daily_series', older_than=0)
+
+    bars = service.get_time_series_daily('IBM')
+    assert bars[-1]['close'] == 250.12
+    assert service.history.length('IBM') == len(expected)
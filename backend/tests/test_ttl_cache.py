@@ -0,0 +1,96 @@
+import time
+
+from conftest import make_service
+from services import alpha_vantage_service
+from services.ttl_cache import PersistentTTLCache
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_cache_round_trips_values_with_their_age(tmp_path):
+    cache = PersistentTTLCache(str(tmp_path / 'c.sqlite3'))
+    assert cache.get('quote', 'IBM') is None
+
+    cache.set('quote', 'IBM', {'price': 1.5})
+    value, age = cache.get('quote', 'IBM')
+    assert value == {'price': 1.5}
+    assert 0 <= age < 1
+
+    cache.purge('quote', older_than=0)
+    assert cache.get('quote', 'IBM') is None
+
+
+def test_fresh_hits_skip_the_network(service, stub):
+    first = service.get_quote('IBM')
+    assert service.get_quote('IBM') == first
+    assert stub.count() == 1
+
+
+def test_stale_hits_are_served_immediately_and_refreshed_in_the_background(service, stub, monkeypatch):
+    monkeypatch.setitem(alpha_vantage_service.CACHE_TTLS, 'quote', (0.1, 60))
+    service.get_quote('IBM')
+    time.sleep(0.15)
+    stub.delay = 0.3
+
+    started = time.time()
+    assert service.get_quote('IBM')['symbol'] == 'IBM'
+    assert time.time() - started < 0.2
+    # The refresh is held until it finishes, then let go
+    assert len(service._background) == 1
+    assert _wait_for(lambda: stub.count() == 2)
+    assert _wait_for(lambda: not service._background)
+
+    # The refreshed entry is fresh again
+    stub.delay = 0
+    service.get_quote('IBM')
+    assert stub.count() == 2
+
+
+def test_cache_reads_do_not_block_the_event_loop(service, stub, monkeypatch):
+    service.get_quote('IBM')
+    read = service.cache.get
+
+    def slow_read(*args):
+        time.sleep(0.3)
+        return read(*args)
+
+    monkeypatch.setattr(service.cache, 'get', slow_read)
+    started = time.time()
+    pending = service.submit(service.get_quote_async('IBM'))
+    time.sleep(0.05)
+
+    async def ping():
+        return time.time()
+
+    # Other coroutines keep running while the read is in progress
+    assert service.submit(ping()).result(timeout=1) - started < 0.2
+    assert pending.result(timeout=2)['symbol'] == 'IBM'
+
+
+def test_entries_past_their_stale_window_are_fetched(service, stub, monkeypatch):
+    monkeypatch.setitem(alpha_vantage_service.CACHE_TTLS, 'overview', (0.05, 0.1))
+    service.get_company_overview('IBM')
+    time.sleep(0.15)
+
+    service.get_company_overview('IBM')
+    assert stub.count() == 2
+
+
+def test_cache_survives_a_restart(stub, tmp_path):
+    first = make_service(stub, tmp_path)
+    first.get_company_overview('IBM')
+    first.get_time_series_daily('IBM')
+    first.close()
+
+    restarted = make_service(stub, tmp_path)
+    try:
+        assert restarted.get_company_overview('IBM')['symbol'] == 'IBM'
+        assert len(restarted.get_time_series_daily('IBM')) == 5
+        assert stub.count() == 2
+    finally:
+        restarted.close()
@@ -60,10 +60,52 @@ export const useStockData = (symbols: string[]) => {
 
     fetchStockData();
 
-    // Refresh data every 60 seconds
-    const interval = setInterval(fetchStockData, 60000);
+    // Live updates: the backend pushes only the fields that changed per tick.
+    // Fall back to polling every 60 seconds if the stream is unavailable.
+    let interval: ReturnType<typeof setInterval> | undefined;
+    const stream = typeof EventSource !== 'undefined'
+      ? new EventSource(apiUrl(`/api/stocks/stream?symbols=${encodeURIComponent(symbols.join(','))}`))
+      : null;
 
-    return () => clearInterval(interval);
+    if (stream) {
+      // Sent on every (re)connect, so deltas missed while disconnected are covered
+      stream.addEventListener('snapshot', (event) => {
+        const data = JSON.parse((event as MessageEvent).data);
+        const dataMap: Record<string, StockData> = {};
+        (data.stocks || []).forEach((stock: StockData) => {
+          dataMap[stock.symbol] = stock;
+        });
+        setStockData(dataMap);
+      });
+      stream.addEventListener('delta', (event) => {
+        const delta: Record<string, Partial<StockData>> = JSON.parse((event as MessageEvent).data);
+        setStockData((previous) => {
+          const next = { ...previous };
+          Object.entries(delta).forEach(([symbol, fields]) => {
+            if (next[symbol]) {
+              next[symbol] = { ...next[symbol], ...fields };
+            }
+          });
+          return next;
+        });
+      });
+      // EventSource reconnects on its own after transient errors; poll only once
+      // it has given up (e.g. the server refused the stream because it is full)
+      stream.onerror = () => {
+        if (stream.readyState === EventSource.CLOSED && !interval) {
+          interval = setInterval(fetchStockData, 60000);
+        }
+      };
+    } else {
+      interval = setInterval(fetchStockData, 60000);
+    }
+
+    return () => {
+      stream?.close();
+      if (interval) {
+        clearInterval(interval);
+      }
+    };
   }, [JSON.stringify(symbols)]);
 
   return { stockData, loading, error };